@@ -1,25 +1,23 @@
 import logging
+import time
+
+_started_at = time.perf_counter()
+
 from kivymd.app import MDApp
-from kivy.uix.screenmanager import ScreenManager, FadeTransition
+from kivy.uix.screenmanager import FadeTransition, NoTransition
 from kivy.core.window import Window
+from kivy.clock import Clock
 from kivy.utils import platform
 from kivymd.uix.navigationdrawer import MDNavigationLayout
 
-from src.screens.intro.intro import IntroScreen
-from src.screens.intro.intro_info import IntroInfoScreen
-from src.screens.account.login import LoginScreen
-from src.screens.account.register import RegisterScreen
-from src.screens.home import HomeScreen
-
-from src.screens.error_404 import Error404Screen
-from src.screens.exam.exam_setup import ExamSetupScreen
-from src.screens.exam.exam_question import ExamQuestionScreen
-from src.screens.exam.exam_result import ExamResultScreen
-from src.screens.account.profile import PersonalInfoScreen
-from src.screens.exam.exam_history import ExamHistoryScreen
-from src.screens.exam.exam_detail import ExamDetailScreen
+from src.screens.registry import LazyScreenManager
 from src.components.navigation import NavigationDrawer
-from src.screens.package.payment_success import PaymentSuccessScreen
+from src.services.api_client import api
+from src.services.local_db import local_db
+from src.services.outbox import outbox
+from src.services.render_profile import render_profile
+from src.services.session_store import session_store
+from src.services.task_runner import task_runner
 
 
 logging.basicConfig(
@@ -41,31 +39,12 @@ class EducationPlus(MDApp):
             self.theme_cls.primary_palette = "Blue"
             self.theme_cls.primary_hue = "700"
 
-            sm = ScreenManager(transition=FadeTransition())
-
-            screens = [
-                (IntroScreen, 'intro'),
-                (IntroInfoScreen, 'intro_info'),
-                (LoginScreen, 'login'),
-                (RegisterScreen, 'register'),
-                (HomeScreen, 'home'),
-                (ExamSetupScreen, 'exam_setup'),
-                (ExamQuestionScreen, 'exam_question'),
-                (ExamResultScreen, 'exam_result'),
-                (ExamHistoryScreen, 'exam_history'),
-                (ExamDetailScreen, 'exam_detail'),
-                (Error404Screen, 'error_404'),
-                (PersonalInfoScreen, 'personal_info'),
-                (Error404Screen, 'error_404')
-            ]
-
-            for screen_class, name in screens:
-                try:
-                    sm.add_widget(screen_class(name=name))
-                    logging.debug(f"Added screen: {name}")
-                except Exception as e:
-                    logging.error(f"Lỗi chạy màn hình {name}: {str(e)}", exc_info=True)
-                    raise
+            render_profile.load()
+
+            # Màn hình được import và dựng khi điều hướng tới lần đầu
+            sm = LazyScreenManager(transition=self._make_transition())
+            sm.current = 'intro'
+            render_profile.bind(low_power=lambda *args: setattr(sm, 'transition', self._make_transition()))
 
             nav_layout = MDNavigationLayout()
             nav_layout.add_widget(sm)
@@ -81,6 +60,24 @@ class EducationPlus(MDApp):
             logging.error(f"Lỗi: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def _make_transition():
+        return NoTransition() if render_profile.low_power else FadeTransition()
+
+    def on_start(self):
+        Clock.schedule_once(self._log_first_frame, 0)
+        # Gửi lại các bài nộp còn tồn từ lần chạy trước
+        outbox.start()
+
+    def _log_first_frame(self, dt):
+        logging.info(f"First frame after {(time.perf_counter() - _started_at) * 1000:.0f} ms")
+
+    def on_stop(self):
+        task_runner.shutdown()
+        api.close()
+        session_store.flush()
+        local_db.close()
+
 
 if __name__ == '__main__':
     try:
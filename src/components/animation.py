@@ -0,0 +1,122 @@
+import weakref
+
+from kivy.clock import Clock
+
+from ..services.metrics import metrics
+from ..services.render_profile import render_profile
+
+
+class AnimationDriver:
+    """Một nhịp Clock dùng chung cho mọi animation của component loading
+
+    Component đăng ký khi được gắn vào cây widget và tự hủy khi bị gỡ (xem
+    `AnimatedBehavior`). Mỗi nhịp chỉ gọi `animate(dt)` của component đang thực sự
+    hiển thị (nằm trong cửa sổ, opacity > 0). Không còn component nào hiển thị thì
+    nhịp dừng hẳn và chỉ chạy lại khi một component có thể hiện ra: opacity đổi,
+    hoặc nhánh widget chứa nó (thường là màn hình bị ẩn) được gắn lại vào cây.
+    Tần số nhịp theo `render_profile.animation_fps`.
+
+    Danh sách đăng ký giữ weakref: widget bị bỏ cùng cả nhánh mà không nhận
+    `parent = None` vẫn được thu hồi bình thường.
+    """
+
+    def __init__(self):
+        self._subscribers = weakref.WeakSet()
+        self._event = None
+        self._watches = []  # (weakref tới widget, tên property, uid) đang chờ hiện lại
+        self.active = 0
+        render_profile.bind(animation_fps=self._on_animation_fps)
+        # Để phát hiện rò rỉ: hết loading mà số này khác 0 là có component chưa được gỡ
+        metrics.register_gauge('animations_subscribed', lambda: len(self._subscribers))
+        metrics.register_gauge('animations_active', lambda: self.active)
+
+    @property
+    def subscribed(self):
+        return len(self._subscribers)
+
+    @property
+    def running(self):
+        return self._event is not None
+
+    def subscribe(self, widget):
+        if widget not in self._subscribers:
+            self._subscribers.add(widget)
+            self._resume()
+
+    def unsubscribe(self, widget):
+        self._subscribers.discard(widget)
+        if not self._subscribers:
+            self._unwatch()
+            self._cancel()
+            self.active = 0
+
+    def _on_animation_fps(self, *args):
+        if self._event is not None:
+            self._cancel()
+            self._start()
+
+    def _resume(self, *args):
+        self._unwatch()
+        if self._event is None and self._subscribers:
+            self._start()
+
+    def _start(self):
+        self._event = Clock.schedule_interval(self._tick, render_profile.animation_interval)
+
+    def _cancel(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def _tick(self, dt):
+        visible = [w for w in list(self._subscribers) if w.opacity > 0 and w.get_root_window() is not None]
+        self.active = len(visible)
+        if not visible:
+            self._pause()
+            return False
+        for widget in visible:
+            widget.animate(dt)
+
+    def _pause(self):
+        self._cancel()
+        self._unwatch()
+        for widget in list(self._subscribers):
+            self._watch(widget, 'opacity')
+            if widget.get_root_window() is None:
+                # Gốc của nhánh đang tách khỏi cửa sổ (vd. Screen không phải màn hình hiện tại)
+                top = widget
+                while top.parent is not None:
+                    top = top.parent
+                self._watch(top, 'parent')
+
+    def _watch(self, widget, name):
+        self._watches.append((weakref.ref(widget), name, widget.fbind(name, self._resume)))
+
+    def _unwatch(self):
+        watches, self._watches = self._watches, []
+        for ref, name, uid in watches:
+            widget = ref()
+            if widget is not None:
+                widget.unbind_uid(name, uid)
+
+
+animation_driver = AnimationDriver()
+
+
+class AnimatedBehavior:
+    """Mixin cho widget có animation: đăng ký với `animation_driver` khi có parent
+
+    Lớp con cài `animate(dt)`, không tự tạo Clock event.
+    """
+
+    def on_parent(self, instance, parent):
+        if parent is None:
+            animation_driver.unsubscribe(self)
+        else:
+            animation_driver.subscribe(self)
+
+    def animate(self, dt):
+        pass
+
+    def stop(self):
+        animation_driver.unsubscribe(self)
@@ -0,0 +1,53 @@
+from kivy.lang import Builder
+from kivy.clock import Clock
+from kivy.uix.widget import Widget
+from kivy.properties import (BooleanProperty, ColorProperty, ListProperty, ObjectProperty,
+                             StringProperty)
+
+from ..services.text_measure import text_measure
+
+Builder.load_string("""
+<CachedLabel>:
+    color: app.theme_cls.text_color
+    canvas:
+        Color:
+            rgba: self.color
+        Rectangle:
+            texture: self.texture
+            size: self.texture_size
+            pos: int(self.x), int(self.center_y - self.texture_size[1] / 2.)
+""")
+
+
+class CachedLabel(Widget):
+    """Label chữ tự xuống dòng, texture lấy từ `text_measure`
+
+    Cùng chữ, font và bề rộng thì dùng lại texture đã render thay vì shape lại,
+    hữu ích cho card trong RecycleView (cuộn qua lại, đổi cỡ cửa sổ). Chữ được
+    render màu trắng rồi tô bằng `color`, nên markup chỉ nên dùng để định dạng
+    ([b], [i]...), không đổi màu.
+    """
+    text = StringProperty('')
+    font_style = StringProperty('Body1')
+    markup = BooleanProperty(False)
+    bold = BooleanProperty(False)
+    color = ColorProperty([0, 0, 0, 1])
+    adaptive_height = BooleanProperty(False)
+    texture = ObjectProperty(None, allownone=True)
+    texture_size = ListProperty([0, 0])
+
+    def __init__(self, **kwargs):
+        self._trigger_texture = Clock.create_trigger(self._update_texture, -1)
+        super().__init__(**kwargs)
+        for name in ('text', 'font_style', 'markup', 'bold', 'width'):
+            self.fbind(name, self._trigger_texture)
+        self._trigger_texture()
+
+    def _update_texture(self, *args):
+        texture = None
+        if self.width > 1:
+            texture = text_measure.texture(self.text, self.width, self.font_style, self.markup, self.bold)
+        self.texture = texture
+        self.texture_size = list(texture.size) if texture else [0, 0]
+        if self.adaptive_height:
+            self.height = self.texture_size[1]
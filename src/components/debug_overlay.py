@@ -0,0 +1,108 @@
+import logging
+
+from kivy.uix.modalview import ModalView
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.label import Label
+from kivy.uix.button import Button
+from kivy.metrics import dp, sp
+from kivy.clock import Clock
+
+from ..services.metrics import metrics
+
+REFRESH_INTERVAL = 1.0
+
+
+def _fmt(summary, key):
+    value = summary.get(key)
+    return '-' if value is None else f"{value:.0f}"
+
+
+def format_snapshot(snapshot):
+    """Định dạng snapshot của `metrics` thành văn bản gọn cho màn hình nhỏ"""
+    lines = []
+    for key, stats in sorted(snapshot['endpoints'].items(), key=lambda kv: -kv[1]['requests']):
+        method, _, url = key.partition(' ')
+        path = url[url.find('/'):] if '/' in url else url
+        total, ttfb = stats['total_ms'], stats['ttfb_ms']
+        lines.append(f"[b]{method} {path}[/b]")
+        lines.append(
+            f"  n={stats['requests']} lỗi={stats['error_rate'] * 100:.0f}%"
+            f"  size p50={_fmt(stats['size_bytes'], 'p50')}B"
+        )
+        lines.append(
+            f"  tổng p50/95/99 = {_fmt(total, 'p50')}/{_fmt(total, 'p95')}/{_fmt(total, 'p99')} ms"
+            f"  ttfb p50={_fmt(ttfb, 'p50')}"
+        )
+        if stats['connect_ms']['count']:
+            lines.append(
+                f"  kết nối mới={stats['connect_ms']['count']}"
+                f"  dns={_fmt(stats['dns_ms'], 'p50')} tcp={_fmt(stats['connect_ms'], 'p50')}"
+                f" tls={_fmt(stats['tls_ms'], 'p50')} ms"
+            )
+    if snapshot['gauges']:
+        lines.append('')
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f"{name}: {value}")
+    return '\n'.join(lines) or 'Chưa có request nào'
+
+
+class DebugOverlay(ModalView):
+    """Overlay ẩn hiển thị số liệu mạng theo thời gian thực, xuất được ra JSON"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('size_hint', (0.95, 0.9))
+        kwargs.setdefault('background_color', (0, 0, 0, 0.85))
+        super().__init__(**kwargs)
+        self._event = None
+
+        layout = BoxLayout(orientation='vertical', padding=dp(8), spacing=dp(6))
+
+        scroll = ScrollView()
+        self.label = Label(
+            markup=True,
+            font_size=sp(11),
+            halign='left',
+            valign='top',
+            size_hint_y=None,
+            color=(0.85, 1, 0.85, 1)
+        )
+        self.label.bind(
+            width=lambda obj, val: setattr(obj, 'text_size', (val, None)),
+            texture_size=lambda obj, val: setattr(obj, 'height', val[1])
+        )
+        scroll.add_widget(self.label)
+        layout.add_widget(scroll)
+
+        buttons = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(6))
+        for text, callback in (("Xuất JSON", self.export), ("Reset", self.reset), ("Đóng", self.dismiss)):
+            buttons.add_widget(Button(text=text, on_release=lambda x, cb=callback: cb()))
+        layout.add_widget(buttons)
+
+        self.status = Label(size_hint_y=None, height=dp(20), font_size=sp(10))
+        layout.add_widget(self.status)
+        self.add_widget(layout)
+
+    def on_open(self):
+        self.refresh()
+        self._event = Clock.schedule_interval(lambda dt: self.refresh(), REFRESH_INTERVAL)
+
+    def on_dismiss(self):
+        if self._event:
+            self._event.cancel()
+            self._event = None
+
+    def refresh(self):
+        self.label.text = format_snapshot(metrics.snapshot())
+
+    def export(self):
+        try:
+            path = metrics.export()
+            self.status.text = f"Đã lưu {path}"
+        except OSError as e:
+            logging.error(f"Không xuất được metrics: {e}")
+            self.status.text = f"Lỗi: {e}"
+
+    def reset(self):
+        metrics.reset()
+        self.refresh()
@@ -0,0 +1,81 @@
+import time
+
+from kivy.clock import Clock
+
+# Nửa frame ở 60 Hz, phần còn lại để Kivy vẽ và xử lý input
+DEFAULT_FRAME_BUDGET = 0.008
+
+
+class IncrementalBuilder:
+    """Tạo danh sách widget rải qua nhiều frame thay vì một vòng lặp chặn UI
+
+    `first_batch` item đầu được tạo ngay để màn hình có nội dung tức thì, phần còn
+    lại được thêm dần, mỗi frame không vượt quá `budget` giây. `add` thay cho
+    `container.add_widget` khi kết quả không phải widget (vd. dòng data của RecycleView).
+    """
+
+    def __init__(self, container, items, build_item, budget=DEFAULT_FRAME_BUDGET,
+                 first_batch=4, on_progress=None, on_complete=None, add=None):
+        self.container = container
+        self.add = add or container.add_widget
+        self.items = list(items)
+        self.build_item = build_item
+        self.budget = budget
+        self.first_batch = first_batch
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.index = 0
+        self.cancelled = False
+        self._event = None
+
+    @property
+    def total(self):
+        return len(self.items)
+
+    @property
+    def progress(self):
+        return self.index / self.total if self.total else 1.0
+
+    @property
+    def done(self):
+        return self.index >= self.total
+
+    def start(self):
+        if not self.items:
+            if self.on_complete:
+                self.on_complete()
+            return self
+        self._build(limit=self.first_batch)
+        if not self.done and not self.cancelled:
+            self._event = Clock.schedule_interval(self._step, 0)
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+        if self._event:
+            self._event.cancel()
+            self._event = None
+
+    def _step(self, dt):
+        self._build(budget=self.budget)
+        if self.done or self.cancelled:
+            self._event = None
+            return False
+
+    def _build(self, limit=None, budget=None):
+        started = time.perf_counter()
+        built = 0
+        while not self.done and not self.cancelled:
+            if limit is not None and built >= limit:
+                break
+            if budget is not None and built and time.perf_counter() - started >= budget:
+                break
+            widget = self.build_item(self.items[self.index], self.index)
+            self.add(widget)
+            self.index += 1
+            built += 1
+
+        if built and self.on_progress:
+            self.on_progress(self.index, self.total)
+        if self.done and built and self.on_complete:
+            self.on_complete()
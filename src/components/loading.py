@@ -2,12 +2,18 @@ from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.widget import Widget
-from kivy.graphics import Color, RoundedRectangle, Ellipse
+from kivy.graphics import Color, RoundedRectangle, Ellipse, PushMatrix, PopMatrix, Rotate
 from kivy.metrics import dp
-from kivy.clock import Clock
 
+from .animation import AnimatedBehavior
 
-class LoadingWidget(FloatLayout):
+# Tốc độ animation theo giây, không phụ thuộc số frame
+SPINNER_SPEED = 600  # độ/giây
+BAR_SPEED = 300  # px/giây
+DOTS_INTERVAL = 0.5
+
+
+class LoadingWidget(AnimatedBehavior, FloatLayout):
     def __init__(self, message="Đang xử lý...", spinner_color=None, **kwargs):
         super().__init__(**kwargs)
 
@@ -52,7 +58,10 @@ class LoadingWidget(FloatLayout):
         # Spinner (vòng tròn xoay)
         spinner_widget = Widget(size_hint=(None, None), size=(dp(60), dp(60)))
 
+        # Cung tròn vẽ một lần, xoay bằng Rotate trên GPU thay vì sửa góc Ellipse mỗi frame
         with spinner_widget.canvas:
+            PushMatrix()
+            self.spinner_rotate = Rotate(angle=0, origin=spinner_widget.center)
             Color(*spinner_color)
             self.spinner = Ellipse(
                 pos=spinner_widget.pos,
@@ -60,20 +69,14 @@ class LoadingWidget(FloatLayout):
                 angle_start=0,
                 angle_end=270
             )
+            PopMatrix()
 
         spinner_widget.bind(
             pos=lambda obj, val: setattr(self.spinner, 'pos', val),
-            size=lambda obj, val: setattr(self.spinner, 'size', val)
+            size=lambda obj, val: setattr(self.spinner, 'size', val),
+            center=lambda obj, val: setattr(self.spinner_rotate, 'origin', val)
         )
 
-        # Animation cho spinner (xoay mượt)
-        def rotate_spinner(dt):
-            if hasattr(self, 'spinner'):
-                self.spinner.angle_start = (self.spinner.angle_start + 10) % 360
-                self.spinner.angle_end = (self.spinner.angle_end + 10) % 360
-
-        self.spinner_event = Clock.schedule_interval(rotate_spinner, 1 / 60.0)
-
         # Label text
         self.loading_label = Label(
             text=message,
@@ -100,17 +103,16 @@ class LoadingWidget(FloatLayout):
         """Cập nhật text loading"""
         self.loading_label.text = new_message
 
-    def stop(self):
-        """Dừng animation khi remove widget"""
-        if hasattr(self, 'spinner_event'):
-            self.spinner_event.cancel()
+    def animate(self, dt):
+        # Góc dương của Rotate là ngược chiều kim đồng hồ
+        self.spinner_rotate.angle = (self.spinner_rotate.angle - SPINNER_SPEED * dt) % 360
 
 
 # ==========================================
 # CÁC STYLE LOADING KHÁC NHAU
 # ==========================================
 
-class LoadingDots(FloatLayout):
+class LoadingDots(AnimatedBehavior, FloatLayout):
     """Loading kiểu 3 chấm nhảy (... animation)"""
 
     def __init__(self, message="Đang tải", **kwargs):
@@ -139,20 +141,19 @@ class LoadingDots(FloatLayout):
         # Animation cho dấu chấm
         self.base_message = message
         self.dot_count = 0
+        self.dots_elapsed = 0
 
-        def update_dots(dt):
-            self.dot_count = (self.dot_count + 1) % 4
-            dots = "." * self.dot_count
-            self.loading_label.text = f"{self.base_message}{dots}"
+    def animate(self, dt):
+        self.dots_elapsed += dt
+        if self.dots_elapsed < DOTS_INTERVAL:
+            return
+        self.dots_elapsed = 0
+        self.dot_count = (self.dot_count + 1) % 4
+        dots = "." * self.dot_count
+        self.loading_label.text = f"{self.base_message}{dots}"
 
-        self.dots_event = Clock.schedule_interval(update_dots, 0.5)
 
-    def stop(self):
-        if hasattr(self, 'dots_event'):
-            self.dots_event.cancel()
-
-
-class LoadingBar(FloatLayout):
+class LoadingBar(AnimatedBehavior, FloatLayout):
     """Loading kiểu thanh tiến trình"""
 
     def __init__(self, message="Đang tải...", **kwargs):
@@ -221,12 +222,6 @@ class LoadingBar(FloatLayout):
 
         self.progress_width = 0
 
-        def update_bar(dt):
-            self.progress_width = (self.progress_width + 5) % 210
-            self.progress_bar.size = (self.progress_width, dp(8))
-
-        self.bar_event = Clock.schedule_interval(update_bar, 1 / 60.0)
-
         bar_container.bind(
             pos=lambda obj, val: self.update_bar_pos(),
             size=lambda obj, val: self.update_bar_pos()
@@ -242,6 +237,6 @@ class LoadingBar(FloatLayout):
         self.bar_bg.pos = (self.bar_container.x + dp(20), self.bar_container.center_y - dp(4))
         self.progress_bar.pos = (self.bar_container.x + dp(20), self.bar_container.center_y - dp(4))
 
-    def stop(self):
-        if hasattr(self, 'bar_event'):
-            self.bar_event.cancel()
\ No newline at end of file
+    def animate(self, dt):
+        self.progress_width = (self.progress_width + BAR_SPEED * dt) % 210
+        self.progress_bar.size = (self.progress_width, dp(8))
\ No newline at end of file
@@ -1,8 +1,22 @@
 from kivy.lang import Builder
+from kivy.properties import StringProperty
 from kivymd.uix.navigationdrawer import MDNavigationDrawer
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton
-from kivy.storage.jsonstore import JsonStore
+import time
+
+from ..services.render_profile import render_profile, MODES, MODE_AUTO, MODE_NORMAL, MODE_LOW_POWER
+from ..services.session_store import session_store
+
+# Chạm nhanh 5 lần vào nhãn "MENU CHÍNH" để mở overlay số liệu mạng
+DEBUG_TAPS = 5
+DEBUG_TAP_WINDOW = 2.0
+
+RENDER_MODE_LABELS = {
+    MODE_AUTO: "Tự động",
+    MODE_NORMAL: "Đầy đủ",
+    MODE_LOW_POWER: "Tiết kiệm pin",
+}
 
 NAV_KV = '''
 <DrawerClickableItem@MDNavigationDrawerItem>
@@ -18,6 +32,7 @@ NAV_KV = '''
     MDNavigationDrawerMenu:
         MDNavigationDrawerLabel:
             text: "MENU CHÍNH"
+            on_touch_down: if self.collide_point(*args[1].pos): root.on_menu_label_tap()
 
         DrawerClickableItem:
             icon: "home"
@@ -55,6 +70,12 @@ NAV_KV = '''
         MDNavigationDrawerLabel:
             text: "TÀI KHOẢN"
 
+        DrawerClickableItem:
+            icon: "battery-heart-variant"
+            text: root.render_mode_text
+            on_release: 
+                root.cycle_render_mode()
+
         DrawerClickableItem:
             icon: "cog"
             text: "Cài đặt"
@@ -72,10 +93,25 @@ Builder.load_string(NAV_KV)
 
 
 class NavigationDrawer(MDNavigationDrawer):
+    render_mode_text = StringProperty('')
+
     def __init__(self, screen_manager=None, **kwargs):
         super().__init__(**kwargs)
         self.screen_manager = screen_manager
         self.dialog = None
+        self._debug_taps = []
+        render_profile.bind(mode=self._update_render_mode_text, low_power=self._update_render_mode_text)
+        self._update_render_mode_text()
+
+    def _update_render_mode_text(self, *args):
+        text = f"Hiển thị: {RENDER_MODE_LABELS[render_profile.mode]}"
+        if render_profile.mode == MODE_AUTO and render_profile.low_power:
+            text += " (tiết kiệm)"
+        self.render_mode_text = text
+
+    def cycle_render_mode(self):
+        """Chuyển lần lượt Tự động -> Đầy đủ -> Tiết kiệm pin"""
+        render_profile.set_mode(MODES[(MODES.index(render_profile.mode) + 1) % len(MODES)])
 
     def navigate(self, screen_name):
         self.set_state("close")
@@ -91,6 +127,18 @@ class NavigationDrawer(MDNavigationDrawer):
             except Exception as e:
                 print(f"Lỗi chuyển màn hình: {e}")
 
+    def on_menu_label_tap(self):
+        now = time.monotonic()
+        self._debug_taps = [t for t in self._debug_taps if now - t < DEBUG_TAP_WINDOW] + [now]
+        if len(self._debug_taps) >= DEBUG_TAPS:
+            self._debug_taps = []
+            self.show_debug_overlay()
+
+    def show_debug_overlay(self):
+        from .debug_overlay import DebugOverlay
+        self.set_state("close")
+        DebugOverlay().open()
+
     def show_coming_soon(self, feature_name):
         """Hiển thị thông báo tính năng đang phát triển"""
         self.set_state("close")
@@ -136,11 +184,7 @@ class NavigationDrawer(MDNavigationDrawer):
         if self.dialog:
             self.dialog.dismiss()
         try:
-            store = JsonStore("user.json")
-            if store.exists("auth"):
-                store.delete("auth")
-            if store.exists("user"):
-                store.delete("user")
+            session_store.clear_auth()
             print("Đã xóa token và dữ liệu người dùng.")
         except Exception as e:
             print(f"Lỗi khi xóa token: {e}")
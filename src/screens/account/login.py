@@ -12,12 +12,16 @@ from kivy.graphics import Color, RoundedRectangle
 from kivy.metrics import dp
 from kivy.clock import Clock
 import requests
-from kivy.storage.jsonstore import JsonStore
 import threading
 import webbrowser
 from urllib.parse import urlencode
 import secrets
 
+from ...services.api_client import api
+from ...services.outbox import outbox
+from ...services.session_store import session_store
+from ...services.task_runner import task_runner, run_on_main
+
 
 class LoginScreen(Screen):
     def __init__(self, **kwargs):
@@ -385,40 +389,38 @@ class LoginScreen(Screen):
 
         self.show_loading()
 
-        thread = threading.Thread(target=self.do_login, args=(email, password))
-        thread.daemon = True
-        thread.start()
+        task_runner.submit(self.do_login, email, password)
 
     def do_login(self, email, password):
         try:
-            response = requests.post(
-                'https://backend-onlinesystem.onrender.com/api/users/login',
+            response = api.post(
+                '/api/users/login',
                 json={'email': email, 'password': password},
                 timeout=15
             )
             data = response.json()
 
             if response.status_code == 200 and data.get('success'):
-                store = JsonStore('user.json')
-                store.put('auth', token=data['token'], user=data['user'], login_time=data['login_time'])
+                session_store.put('auth', token=data['token'], user=data['user'], login_time=data['login_time'])
 
-                Clock.schedule_once(lambda dt: self._on_login_success(data['user']['fullName']))
+                run_on_main(self._on_login_success, data['user']['fullName'])
             else:
                 msg = data.get('message', 'Đăng nhập thất bại. Vui lòng kiểm tra lại thông tin.')
-                Clock.schedule_once(lambda dt: self._on_login_error(msg))
+                run_on_main(self._on_login_error, msg)
 
         except requests.exceptions.Timeout:
-            Clock.schedule_once(lambda dt: self._on_login_error("Kết nối timeout. Vui lòng thử lại."))
+            run_on_main(self._on_login_error, "Kết nối timeout. Vui lòng thử lại.")
         except requests.exceptions.ConnectionError:
-            Clock.schedule_once(
-                lambda dt: self._on_login_error("Không thể kết nối đến server.\nVui lòng kiểm tra kết nối internet."))
+            run_on_main(self._on_login_error, "Không thể kết nối đến server.\nVui lòng kiểm tra kết nối internet.")
         except requests.exceptions.RequestException as e:
-            Clock.schedule_once(lambda dt: self._on_login_error(f"Lỗi mạng: {str(e)}"))
+            run_on_main(self._on_login_error, f"Lỗi mạng: {str(e)}")
         except Exception as e:
-            Clock.schedule_once(lambda dt: self._on_login_error(f"Lỗi không xác định: {str(e)}"))
+            run_on_main(self._on_login_error, f"Lỗi không xác định: {str(e)}")
 
     def _on_login_success(self, fullname):
         self.hide_loading()
+        # Gửi lại các bài nộp đang chờ vì token hết hạn
+        outbox.start()
         self.show_success_dialog(
             "Đăng nhập thành công!",
             f"Chào mừng {fullname} trở lại!\n\nHãy tiếp tục hành trình học tập của bạn."
@@ -500,6 +502,7 @@ class LoginScreen(Screen):
 
             # Bắt đầu server local để nhận callback
             # (Cần implement local server để nhận code)
+            # Server chờ callback tới 5 phút nên chạy thread riêng, không chiếm worker của pool
             threading.Thread(target=self.start_oauth_server, daemon=True).start()
 
         except Exception as e:
@@ -563,7 +566,7 @@ class LoginScreen(Screen):
     def handle_oauth_code(self, code):
         """Xử lý authorization code và lấy thông tin user"""
         self.show_loading()
-        threading.Thread(target=self.exchange_code_for_token, args=(code,), daemon=True).start()
+        task_runner.submit(self.exchange_code_for_token, code)
 
     def exchange_code_for_token(self, code):
         """Đổi authorization code lấy access token"""
@@ -578,7 +581,7 @@ class LoginScreen(Screen):
                 'grant_type': 'authorization_code'
             }
 
-            token_response = requests.post(token_url, data=token_data, timeout=10)
+            token_response = api.post(token_url, data=token_data, timeout=10)
             token_json = token_response.json()
 
             if 'access_token' not in token_json:
@@ -588,15 +591,14 @@ class LoginScreen(Screen):
 
             # Lấy thông tin user
             user_info_url = "https://www.googleapis.com/oauth2/v2/userinfo"
-            headers = {'Authorization': f'Bearer {access_token}'}
-            user_response = requests.get(user_info_url, headers=headers, timeout=10)
+            user_response = api.get(user_info_url, token=access_token, timeout=10)
             user_data = user_response.json()
 
             # Lưu thông tin user
-            Clock.schedule_once(lambda dt: self.process_google_user(user_data))
+            run_on_main(self.process_google_user, user_data)
 
         except Exception as e:
-            Clock.schedule_once(lambda dt: self._on_google_login_error(str(e)))
+            run_on_main(self._on_google_login_error, str(e))
 
     def process_google_user(self, user_data):
         """Xử lý thông tin user từ Google và tạo/đăng nhập tài khoản"""
@@ -613,8 +615,8 @@ class LoginScreen(Screen):
             }
 
             # Gửi lên backend để tạo/đăng nhập tài khoản
-            response = requests.post(
-                'https://backend-onlinesystem.onrender.com/api/users/google-login',
+            response = api.post(
+                '/api/users/google-login',
                 json=google_user,
                 timeout=15
             )
@@ -623,13 +625,12 @@ class LoginScreen(Screen):
 
             if response.status_code == 200 and data.get('success'):
                 # Lưu thông tin đăng nhập
-                store = JsonStore('user.json')
-                store.put('auth',
-                          token=data['token'],
-                          user=data['user'],
-                          login_time=data.get('login_time'),
-                          login_method='google'
-                          )
+                session_store.put('auth',
+                                  token=data['token'],
+                                  user=data['user'],
+                                  login_time=data.get('login_time'),
+                                  login_method='google'
+                                  )
 
                 Clock.schedule_once(lambda dt: self._on_google_login_success(google_user['fullName']))
             else:
@@ -641,6 +642,8 @@ class LoginScreen(Screen):
 
     def _on_google_login_success(self, fullname):
         self.hide_loading()
+        # Gửi lại các bài nộp đang chờ vì token hết hạn
+        outbox.start()
         self.show_success_dialog(
             "Đăng nhập thành công!",
             f"Chào mừng {fullname}!\n\nBạn đã đăng nhập thành công qua Google."
@@ -1,8 +1,6 @@
-import requests
 import logging
 from kivy.lang import Builder
 from kivy.metrics import dp
-from kivy.storage.jsonstore import JsonStore
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.button import MDFlatButton, MDRaisedButton, MDIconButton
 from kivymd.uix.card import MDCard
@@ -11,7 +9,11 @@ from kivymd.uix.textfield import MDTextField
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivy.properties import ObjectProperty, StringProperty
 
-API_URL = "https://backend-onlinesystem.onrender.com/api/users"
+from ...services.api_client import api
+from ...services.session_store import session_store
+from ...services.task_runner import TaskGroup
+
+API_PATH = "/api/users"
 
 Builder.load_string("""
 <PersonalInfoScreen>:
@@ -61,13 +63,17 @@ class PersonalInfoScreen(MDScreen):
         self.email_field = None
         self.dob_field = None
         self.gender_field = None
+        self.tasks = TaskGroup('personal_info')
 
-        store = JsonStore('user.json')
-        self.user_id = store.get('auth')['user'].get('id_user') if store.exists('auth') else None
+        user = session_store.user
+        self.user_id = user.get('id_user') if user else None
 
     def on_enter(self):
         self.load_info()
 
+    def on_leave(self):
+        self.tasks.cancel_all()
+
     def refresh_info(self):
         self.load_info()
 
@@ -79,21 +85,25 @@ class PersonalInfoScreen(MDScreen):
             layout.add_widget(MDLabel(text="❌ Chưa đăng nhập, không có id_user"))
             return
 
-        try:
-            res = requests.get(f"{API_URL}/{self.user_id}", timeout=5)
+        layout.add_widget(MDLabel(text="Đang tải thông tin..."))
+        user_id = self.user_id
+
+        def _load():
+            res = api.get(f"{API_PATH}/{user_id}", timeout=5)
             if res.status_code != 200:
-                layout.add_widget(MDLabel(text=f"❌ Server trả về {res.status_code}: {res.text}"))
-                return
+                raise Exception(f"Server trả về {res.status_code}: {res.text}")
 
             data = res.json()
-            if data.get('success'):
-                self.display_info(data['data'])
-            else:
-                layout.add_widget(MDLabel(text=f"❌ {data.get('message', 'Không tải được thông tin')}"))
+            if not data.get('success'):
+                raise Exception(data.get('message', 'Không tải được thông tin'))
+            return data['data']
 
-        except Exception as e:
+        def _failed(e):
             logging.error(f"Error loading info: {e}")
-            layout.add_widget(MDLabel(text=f"❌ Lỗi: {str(e)}"))
+            layout.clear_widgets()
+            layout.add_widget(MDLabel(text=f"❌ {str(e)}"))
+
+        self.tasks.submit(_load, key='info', on_success=self.display_info, on_error=_failed)
 
     def display_info(self, user):
         layout = self.ids.info_layout
@@ -178,20 +188,19 @@ class PersonalInfoScreen(MDScreen):
             self.ids.info_layout.add_widget(MDLabel(text="❌ Không có ID người dùng"))
             return
 
-        try:
-            res = requests.put(f"{API_URL}/update", json=payload, timeout=5)
+        def _save():
+            res = api.put(f"{API_PATH}/update", json=payload, timeout=5)
             if res.status_code != 200:
-                self.ids.info_layout.add_widget(MDLabel(text=f"❌ Server trả về {res.status_code}: {res.text}"))
-                return
+                raise Exception(f"Server trả về {res.status_code}: {res.text}")
 
             data = res.json()
-            if data.get("success"):
-                self.load_info()
-            else:
-                self.ids.info_layout.add_widget(MDLabel(text=f"❌ {data.get('message')}"))
+            if not data.get("success"):
+                raise Exception(data.get('message'))
+
+        def _failed(e):
+            self.ids.info_layout.add_widget(MDLabel(text=f"❌ {str(e)}"))
 
-        except Exception as e:
-            self.ids.info_layout.add_widget(MDLabel(text=f"❌ Lỗi: {str(e)}"))
+        self.tasks.submit(_save, key='save', on_success=lambda result: self.load_info(), on_error=_failed)
 
     def go_back(self):
         self.manager.current = 'home'
@@ -7,7 +7,6 @@ from kivymd.uix.card import MDCard
 from kivymd.uix.selectioncontrol import MDCheckbox
 from kivymd.uix.scrollview import MDScrollView
 from kivymd.uix.dialog import MDDialog
-from kivymd.uix.pickers import MDDatePicker
 from kivymd.uix.spinner import MDSpinner
 from kivy.uix.modalview import ModalView
 from kivy.metrics import dp
@@ -16,6 +15,8 @@ import re
 import requests
 from datetime import datetime
 
+from ...services.api_client import api
+
 
 class RegisterScreen(Screen):
     def __init__(self, **kwargs):
@@ -345,6 +346,8 @@ class RegisterScreen(Screen):
             self.loading_modal.dismiss()
 
     def open_date_picker(self, instance):
+        # MDDatePicker nặng, chỉ import khi người dùng mở lịch
+        from kivymd.uix.pickers import MDDatePicker
         date_dialog = MDDatePicker()
         date_dialog.bind(on_save=self.on_date_selected)
         date_dialog.open()
@@ -446,8 +449,8 @@ class RegisterScreen(Screen):
 
     def _send_register_request(self, data):
         try:
-            response = requests.post(
-                'https://backend-onlinesystem.onrender.com/api/users/register',
+            response = api.post(
+                '/api/users/register',
                 json={
                     'fullName': data['full_name'],
                     'email': data['email'],
@@ -4,7 +4,8 @@ from kivymd.uix.screen import MDScreen
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
 from kivymd.uix.button import MDRaisedButton
-import requests
+
+from ..services.api_client import api
 
 class Error404Screen(MDScreen):
     def __init__(self, **kwargs):
@@ -34,7 +35,7 @@ class Error404Screen(MDScreen):
 
     def retry_connection(self):
         try:
-            requests.get("https://www.google.com", timeout=3)
+            api.get("https://www.google.com", timeout=3)
             self.manager.current = "login"  # hoặc màn hình khác
         except:
             pass  # vẫn ở màn hình lỗi
@@ -50,7 +51,7 @@ class Error404Screen(MDScreen):
 
         # 🔌 Kiểm tra kết nối Internet
         try:
-            requests.get("https://www.google.com", timeout=3)
+            api.get("https://www.google.com", timeout=3)
             logging.debug("Internet connection OK")
         except:
             logging.warning("No Internet connection!")
@@ -1,8 +1,13 @@
-from .exam_setup import ExamSetupScreen
-from .exam_question import ExamQuestionScreen
-from .exam_result import ExamResultScreen
-from .exam_history import ExamHistoryScreen
-from .exam_detail import ExamDetailScreen
+import importlib
+
+# Import lười: chỉ nạp module của màn hình khi thực sự được dùng
+_SCREEN_MODULES = {
+    'ExamSetupScreen': '.exam_setup',
+    'ExamQuestionScreen': '.exam_question',
+    'ExamResultScreen': '.exam_result',
+    'ExamHistoryScreen': '.exam_history',
+    'ExamDetailScreen': '.exam_detail',
+}
 
 __all__ = [
     'ExamSetupScreen',
@@ -12,4 +17,12 @@ __all__ = [
     'ExamDetailScreen',
 ]
 
+
+def __getattr__(name):
+    if name in _SCREEN_MODULES:
+        module = importlib.import_module(_SCREEN_MODULES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 print("✅ Exam module loaded successfully!")
\ No newline at end of file
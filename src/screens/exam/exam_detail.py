@@ -1,19 +1,79 @@
-import requests
 import logging
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.button import MDFlatButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.card import MDCard
-from kivymd.uix.label import MDLabel
 from kivy.lang import Builder
 from kivy.metrics import dp
-
 from kivy.clock import Clock
-import threading
-
-API_URL = "https://backend-onlinesystem.onrender.com/api/exam"
+from kivy.core.window import Window
+from kivy.properties import ListProperty, NumericProperty, StringProperty
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+from ...components.cached_label import CachedLabel  # dùng trong KV
+from ...components.incremental import IncrementalBuilder
+from ...services.api_client import api
+from ...services.local_db import local_db
+from ...services.session_store import session_store
+from ...services.task_runner import TaskGroup
+from ...services.text_measure import text_measure
+
+API_PATH = "/api/exam"
+
+# Khoảng cách cố định của AnswerReviewCard, dùng để tính chiều cao dòng
+SCREEN_PADDING = dp(20)
+LIST_PADDING = dp(5)
+CARD_PADDING = dp(15)
+CARD_SPACING = dp(10)
+HEADER_HEIGHT = dp(25)
+ANSWER_LINE_HEIGHT = dp(28)
 
 KV = """
+<ReviewLabel@CachedLabel>:
+    size_hint_y: None
+    markup: True
+
+<AnswerReviewCard>:
+    orientation: 'vertical'
+    padding: dp(15)
+    spacing: dp(10)
+    elevation: 3
+    radius: [12, 12, 12, 12]
+    md_bg_color: root.bg_color
+
+    ReviewLabel:
+        text: '[b]Câu {}:[/b]'.format(root.number)
+        font_style: 'Subtitle1'
+        height: dp(25)
+
+    ReviewLabel:
+        text: root.ques_text
+        markup: False
+        font_style: 'Body1'
+        height: root.ques_height
+
+    ReviewLabel:
+        text: root.options_text
+        font_style: 'Body2'
+        height: root.options_height
+
+    ReviewLabel:
+        text: root.user_answer_text
+        font_style: 'Body2'
+        height: root.user_answer_height
+        color: root.border_color
+
+    ReviewLabel:
+        text: root.correct_text
+        font_style: 'Body2'
+        height: root.correct_height
+        color: 0.2, 0.8, 0.2, 1
+
+    ReviewLabel:
+        text: root.explanation_text
+        font_style: 'Caption'
+        height: root.explanation_height
+
 <ExamDetailScreen>:
     MDBoxLayout:
         orientation: 'vertical'
@@ -88,64 +148,99 @@ KV = """
                 size_hint_y: None
                 height: dp(20)
 
-        ScrollView:
+        # Danh sách câu trả lời (chỉ tạo đủ card cho phần đang hiển thị)
+        RecycleView:
+            id: answer_list
+            viewclass: 'AnswerReviewCard'
 
-            MDBoxLayout:
-                id: detail_layout
+            RecycleBoxLayout:
+                default_size: None, dp(300)
+                default_size_hint: 1, None
+                size_hint_y: None
+                height: self.minimum_height
                 orientation: 'vertical'
                 spacing: dp(15)
                 padding: dp(5)
-                size_hint_y: None
-                height: self.minimum_height
 """
 
 Builder.load_string(KV)
 
 
+class AnswerReviewCard(RecycleDataViewBehavior, MDCard):
+    """Card xem lại một câu, chiều cao từng phần đã đo sẵn trong data"""
+    number = NumericProperty(0)
+    bg_color = ListProperty([1, 1, 1, 1])
+    border_color = ListProperty([0, 0, 0, 1])
+    ques_text = StringProperty('')
+    ques_height = NumericProperty(0)
+    options_text = StringProperty('')
+    options_height = NumericProperty(0)
+    user_answer_text = StringProperty('')
+    user_answer_height = NumericProperty(0)
+    correct_text = StringProperty('')
+    correct_height = NumericProperty(0)
+    explanation_text = StringProperty('')
+    explanation_height = NumericProperty(0)
+
+
 class ExamDetailScreen(MDScreen):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.dialog = None
         self.result_data = None
+        self.answers = []
+        self.label_width = None
+        self.tasks = TaskGroup('exam_detail')
+        self.builder = None
+        self._remeasure_trigger = Clock.create_trigger(lambda dt: self.remeasure(), 0.1)
+        self.ids.answer_list.bind(width=lambda *args: self._remeasure_trigger())
 
     def load_result_detail(self, result_id, from_screen='exam_result'):
         self.from_screen = from_screen
 
+        token = self.get_token()
+        if not token:
+            self.show_error_dialog("Lỗi", "Bạn chưa đăng nhập")
+            return
+
         def _load():
-            try:
-                token = self.get_token()
-                if not token:
-                    Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", "Bạn chưa đăng nhập"))
-                    return
-
-                res = requests.get(
-                    f"{API_URL}/result/{result_id}/detail",
-                    headers={"Authorization": f"Bearer {token}"},
-                    timeout=10
-                )
-                if res.status_code != 200:
-                    try:
-                        msg = res.json().get('message', res.text)
-                    except Exception:
-                        msg = res.text
-                    Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", msg))
-                    return
-
-                data = res.json()
-                if not data.get('success'):
-                    Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", data.get('message', 'Lỗi server')))
-                    return
-
-                self.result_data = data.get('result')
-                answers = data.get('answers', [])
-                Clock.schedule_once(lambda dt: self.display_detail(self.result_data, answers))
-
-            except Exception as e:
-                logging.error(f"Error loading detail: {e}")
-                Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", str(e)))
-
-        threading.Thread(target=_load, daemon=True).start()
+            # Kết quả đã nộp không đổi nên bản lưu cục bộ dùng được luôn
+            stored = local_db.result_detail(result_id)
+            if stored:
+                return stored
+
+            res = api.get(
+                f"{API_PATH}/result/{result_id}/detail",
+                token=token,
+                timeout=10,
+                hedge=True
+            )
+            if res.status_code != 200:
+                try:
+                    msg = res.json().get('message', res.text)
+                except Exception:
+                    msg = res.text
+                raise Exception(msg)
+
+            data = res.json()
+            if not data.get('success'):
+                raise Exception(data.get('message', 'Lỗi server'))
+
+            result, answers = data.get('result'), data.get('answers', [])
+            if result:
+                local_db.put_result_detail(result_id, result, answers)
+            return result, answers
+
+        def _done(result):
+            self.result_data, answers = result
+            self.display_detail(self.result_data, answers)
+
+        def _failed(e):
+            logging.error(f"Error loading detail: {e}")
+            self.show_error_dialog("Lỗi", str(e))
+
+        self.tasks.submit(_load, key='detail', on_success=_done, on_error=_failed)
 
     def display_detail(self, result, answers):
         self.ids.summary_title.text = result.get('exam_cat', 'Kết quả')
@@ -159,16 +254,51 @@ class ExamDetailScreen(MDScreen):
         except Exception:
             self.ids.summary_date.text = "N/A"
 
-        detail_layout = self.ids.detail_layout
-        detail_layout.clear_widgets()
-
-        for idx, answer in enumerate(answers):
-            card = self.create_answer_card(answer, idx + 1)
-            detail_layout.add_widget(card)
-
-    def create_answer_card(self, answer, question_number):
+        self.answers = answers
+        self.label_width = self._label_width()
+        self.ids.answer_list.data = []
+        self.ids.answer_list.scroll_y = 1
+        self._measure_rows()
+
+    def _measure_rows(self):
+        """Đo chữ rải qua nhiều frame, các dòng đầu có ngay"""
+        if self.builder:
+            self.builder.cancel()
+        width = self.label_width
+        self.builder = IncrementalBuilder(
+            None, self.answers,
+            lambda answer, idx: self.answer_row(answer, idx + 1, width),
+            add=self._put_row
+        ).start()
+
+    def _put_row(self, row):
+        data = self.ids.answer_list.data
+        index = row['number'] - 1
+        if index < len(data):
+            data[index] = row
+        else:
+            data.append(row)
+
+    def _label_width(self):
+        answer_list = self.ids.answer_list
+        # Màn hình chưa hiển thị thì RecycleView chưa có kích thước thật, ước lượng theo cửa sổ
+        list_width = answer_list.width if answer_list.get_root_window() else Window.width - 2 * SCREEN_PADDING
+        return int(list_width - 2 * LIST_PADDING - 2 * CARD_PADDING)
+
+    def remeasure(self):
+        """Bề rộng thay đổi (xoay màn hình, đổi cỡ cửa sổ): đo lại chiều cao từng dòng"""
+        if not self.answers or not self.ids.answer_list.get_root_window():
+            return
+        width = self._label_width()
+        if width == self.label_width:
+            return
+        self.label_width = width
+        self._measure_rows()
+
+    @staticmethod
+    def answer_row(answer, question_number, width):
+        """Dữ liệu cho AnswerReviewCard, chiều cao lấy từ đo chữ thật"""
         is_correct = bool(answer.get('is_correct'))
-
         if is_correct:
             bg_color = [0.2, 0.8, 0.2, 0.12]
             border_color = [0.2, 0.8, 0.2, 1]
@@ -176,101 +306,47 @@ class ExamDetailScreen(MDScreen):
             bg_color = [0.95, 0.85, 0.85, 1]
             border_color = [0.8, 0.2, 0.2, 1]
 
-        card = MDCard(
-            orientation='vertical',
-            padding=dp(15),
-            spacing=dp(10),
-            size_hint_y=None,
-            elevation=3,
-            radius=[12, 12, 12, 12],
-            md_bg_color=bg_color
+        ques_text = answer.get('ques_text', '') or ''
+        options_text = (
+            f"[b]A.[/b] {answer.get('ans_a')}\n"
+            f"[b]B.[/b] {answer.get('ans_b')}\n"
+            f"[b]C.[/b] {answer.get('ans_c')}\n"
+            f"[b]D.[/b] {answer.get('ans_d')}"
         )
-
-        header = MDLabel(
-            text=f"[b]Câu {question_number}:[/b]",
-            markup=True,
-            font_style='Subtitle1',
-            size_hint_y=None,
-            height=dp(25)
-        )
-        card.add_widget(header)
-
-        question_text = MDLabel(
-            text=answer.get('ques_text', ''),
-            font_style='Body1',
-            size_hint_y=None,
-            adaptive_height=True
-        )
-        card.add_widget(question_text)
-
-        ans_a = answer.get('ans_a')
-        ans_b = answer.get('ans_b')
-        ans_c = answer.get('ans_c')
-        ans_d = answer.get('ans_d')
-
-        answer_text = MDLabel(
-            text=f"[b]A.[/b] {ans_a}\n"
-                 f"[b]B.[/b] {ans_b}\n"
-                 f"[b]C.[/b] {ans_c}\n"
-                 f"[b]D.[/b] {ans_d}",
-            markup=True,
-            font_style='Body2',
-            size_hint_y=None,
-            adaptive_height=True
-        )
-        card.add_widget(answer_text)
-
-        # Câu trả lời của người dùng
-        user_answer_label = MDLabel(
-            text=f"[b]Câu trả lời của bạn:[/b] {answer.get('answer', 'Chưa trả lời')}",
-            markup=True,
-            font_style='Body2',
-            size_hint_y=None,
-            height=dp(28),
-            theme_text_color='Custom',
-            text_color=border_color
-        )
-        card.add_widget(user_answer_label)
-
-        # Đáp án đúng nếu trả lời sai
-        if not is_correct:
-            correct_answer_label = MDLabel(
-                text=f"[b]Đáp án đúng:[/b] {answer.get('correct_ans', '')}",
-                markup=True,
-                font_style='Body2',
-                size_hint_y=None,
-                height=dp(28),
-                theme_text_color='Custom',
-                text_color=[0.2, 0.8, 0.2, 1]
-            )
-            card.add_widget(correct_answer_label)
-
-        if answer.get('explanation'):
-            explanation_label = MDLabel(
-                text=f"[b]Giải thích:[/b] {answer.get('explanation')}",
-                markup=True,
-                font_style='Caption',
-                size_hint_y=None,
-                adaptive_height=True
-            )
-            card.add_widget(explanation_label)
-
-        base_height = dp(60)
-        question_len = len(answer.get('ques_text', ''))
-        question_height = max(dp(30), question_len * 0.35)
-
-        answers_height = dp(100)
-
-        if not is_correct:
-            answers_height += dp(30)
-
-        if answer.get('explanation'):
-            exp_len = len(answer.get('explanation', ''))
-            answers_height += max(dp(40), exp_len * 0.3)
-
-        card.height = base_height + question_height + answers_height
-
-        return card
+        user_answer_text = f"[b]Câu trả lời của bạn:[/b] {answer.get('answer', 'Chưa trả lời')}"
+        correct_text = '' if is_correct else f"[b]Đáp án đúng:[/b] {answer.get('correct_ans', '')}"
+        explanation_text = f"[b]Giải thích:[/b] {answer['explanation']}" if answer.get('explanation') else ''
+
+        ques_height = text_measure.height(ques_text, width, 'Body1')
+        options_height = text_measure.height(options_text, width, 'Body2', markup=True)
+        user_answer_height = max(ANSWER_LINE_HEIGHT, text_measure.height(user_answer_text, width, 'Body2', markup=True))
+        correct_height = max(
+            ANSWER_LINE_HEIGHT, text_measure.height(correct_text, width, 'Body2', markup=True)
+        ) if correct_text else 0
+        explanation_height = text_measure.height(explanation_text, width, 'Caption', markup=True)
+
+        heights = (HEADER_HEIGHT, ques_height, options_height, user_answer_height, correct_height, explanation_height)
+        return {
+            'number': question_number,
+            'bg_color': bg_color,
+            'border_color': border_color,
+            'ques_text': ques_text,
+            'ques_height': ques_height,
+            'options_text': options_text,
+            'options_height': options_height,
+            'user_answer_text': user_answer_text,
+            'user_answer_height': user_answer_height,
+            'correct_text': correct_text,
+            'correct_height': correct_height,
+            'explanation_text': explanation_text,
+            'explanation_height': explanation_height,
+            'height': sum(heights) + CARD_SPACING * (len(heights) - 1) + 2 * CARD_PADDING,
+        }
+
+    def on_leave(self):
+        self.tasks.cancel_all()
+        if self.builder:
+            self.builder.cancel()
 
     def go_back(self):
         if getattr(self, 'from_screen', '') == 'exam_history':
@@ -280,12 +356,9 @@ class ExamDetailScreen(MDScreen):
 
     def get_token(self):
         try:
-            from kivy.storage.jsonstore import JsonStore
-            store = JsonStore('user.json')
-
             for key in ('auth', 'token', 'user'):
-                if store.exists(key):
-                    d = store.get(key)
+                if session_store.exists(key):
+                    d = session_store.get(key)
                     token = d.get('token') or d.get('access_token') or d.get('auth') if isinstance(d, dict) else d
                     if token:
                         return token
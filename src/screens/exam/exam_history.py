@@ -1,19 +1,74 @@
-import requests
 import logging
+import time
+
 from kivymd.uix.screen import MDScreen
-from kivymd.uix.button import MDFlatButton, MDRaisedButton
+from kivymd.uix.button import MDFlatButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.card import MDCard
-from kivymd.uix.label import MDLabel
-from kivymd.uix.boxlayout import MDBoxLayout
 from kivy.lang import Builder
-from kivy.metrics import dp
-from kivy.clock import Clock
-import threading
+from kivy.properties import BooleanProperty, ListProperty, ObjectProperty, StringProperty
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+from ...services.api_client import api
+from ...services.local_db import local_db
+from ...services.session_store import session_store
+from ...services.task_runner import TaskGroup
 
-API_URL = "https://backend-onlinesystem.onrender.com/api/exam"
+API_PATH = "/api/exam"
+HISTORY_PAGE_SIZE = 50
+# Delta sync không thấy bài bị xóa trên server nên định kỳ vẫn đồng bộ toàn bộ
+HISTORY_FULL_SYNC_INTERVAL = 24 * 60 * 60
 
 KV = """
+<HistoryCard>:
+    orientation: 'vertical'
+    padding: dp(12)
+    spacing: dp(8)
+    elevation: 3
+    radius: [12, 12, 12, 12]
+
+    MDLabel:
+        text: root.exam_name
+        font_style: 'H6'
+        bold: True
+        size_hint_y: None
+        height: dp(30)
+
+    MDLabel:
+        text: root.score_text
+        font_style: 'H6'
+        theme_text_color: 'Custom'
+        text_color: root.score_color
+        size_hint_y: None
+        height: dp(30)
+
+    MDLabel:
+        text: root.correct_text
+        font_style: 'Subtitle1'
+        size_hint_y: None
+        height: dp(25)
+
+    MDLabel:
+        text: root.category_text
+        font_style: 'Body2'
+        size_hint_y: None
+        height: dp(25)
+
+    MDLabel:
+        text: root.date_text
+        font_style: 'Caption'
+        size_hint_y: None
+        height: dp(20)
+
+    MDRaisedButton:
+        text: 'Xem chi tiết'
+        size_hint_x: 1
+        size_hint_y: None
+        height: dp(44)
+        md_bg_color: 0.2, 0.6, 1, 1
+        on_release: root.view_detail()
+
 <ExamHistoryScreen>:
     MDBoxLayout:
         orientation: 'vertical'
@@ -43,173 +98,225 @@ KV = """
                 size_hint_x: None
                 width: dp(50)
 
-        # History list
-        ScrollView:
-            MDBoxLayout:
-                id: history_layout
+        MDCard:
+            orientation: 'vertical'
+            padding: dp(30) if root.empty else 0
+            size_hint_y: None
+            height: dp(150) if root.empty else 0
+            opacity: 1 if root.empty else 0
+            elevation: 2 if root.empty else 0
+            radius: [15, 15, 15, 15]
+
+            MDLabel:
+                text: 'Chưa có lịch sử bài thi\\n\\nHãy bắt đầu làm bài kiểm tra đầu tiên!'
+                halign: 'center'
+                font_style: 'Body1'
+
+        # History list (chỉ tạo đủ card cho phần đang hiển thị)
+        HistoryList:
+            id: history_list
+            screen: root
+            viewclass: 'HistoryCard'
+
+            RecycleBoxLayout:
+                default_size: None, dp(230)
+                default_size_hint: 1, None
+                size_hint_y: None
+                height: self.minimum_height
                 orientation: 'vertical'
                 spacing: dp(15)
                 padding: dp(5)
-                size_hint_y: None
-                height: self.minimum_height
 """
 
 Builder.load_string(KV)
 
 
+def history_row(item):
+    """Chuyển một bài trong lịch sử thành dữ liệu hiển thị của HistoryCard"""
+    score = item.get('score', 0)
+    if score >= 80:
+        score_color = [0.2, 0.8, 0.2, 1]
+    elif score >= 50:
+        score_color = [0.2, 0.6, 1, 1]
+    else:
+        score_color = [0.8, 0.2, 0.2, 1]
+    date_str = str(item.get('completed_time') or item.get('created_at', ''))[:19]
+    return {
+        'id_result': item.get('id_result'),
+        'exam_name': str(item.get('exam_name', 'Đề thi')),
+        'score_text': f"Điểm: {score}/100",
+        'score_color': score_color,
+        'correct_text': f"Số câu đúng: {item.get('total_correct')}/{item.get('total_ques')}",
+        'category_text': f"Danh mục: {item.get('class_name', 'N/A')}",
+        'date_text': f"Ngày làm: {date_str or 'N/A'}",
+    }
+
+
+class HistoryCard(RecycleDataViewBehavior, MDCard):
+    id_result = ObjectProperty(None, allownone=True)
+    exam_name = StringProperty('')
+    score_text = StringProperty('')
+    score_color = ListProperty([0, 0, 0, 1])
+    correct_text = StringProperty('')
+    category_text = StringProperty('')
+    date_text = StringProperty('')
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rv = None
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.rv = rv
+        super().refresh_view_attrs(rv, index, data)
+
+    def view_detail(self):
+        if self.rv is not None:
+            self.rv.screen.view_detail(self.id_result)
+
+
+class HistoryList(RecycleView):
+    screen = ObjectProperty(None)
+
+
 class ExamHistoryScreen(MDScreen):
+    empty = BooleanProperty(False)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.dialog = None
+        self.tasks = TaskGroup('exam_history')
+        self.history = None
+        self.history_user = None
 
     def on_enter(self):
         self.load_history()
 
+    def on_leave(self):
+        self.tasks.cancel_all()
+
     def load_history(self):
-        def _load():
-            try:
-                token = self.get_token()
-                if not token:
-                    Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", "Bạn chưa đăng nhập"))
-                    return
-
-                res = requests.get(
-                    f"{API_URL}/exam/history",
-                    headers={"Authorization": f"Bearer {token}"},
-                    timeout=10
-                )
-
-                if res.status_code != 200:
-                    try:
-                        msg = res.json().get('message', res.text)
-                    except Exception:
-                        msg = res.text
-                    Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", msg))
-                    return
-
-                data = res.json()
-                if not data.get('success'):
-                    Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", data.get('message', 'Lỗi server')))
-                    return
-
-                history = data.get('history', [])
-                Clock.schedule_once(lambda dt: self.display_history(history))
-
-            except Exception as e:
-                logging.error(f"Error loading history: {e}")
-                Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", str(e)))
-
-        threading.Thread(target=_load, daemon=True).start()
-
-    def display_history(self, history):
-        history_layout = self.ids.history_layout
-        history_layout.clear_widgets()
-
-        if not history:
-            empty_card = MDCard(
-                orientation='vertical',
-                padding=dp(30),
-                size_hint_y=None,
-                height=dp(150),
-                elevation=2,
-                radius=[15, 15, 15, 15]
-            )
-            empty_label = MDLabel(
-                text='Chưa có lịch sử bài thi\n\nHãy bắt đầu làm bài kiểm tra đầu tiên!',
-                halign='center',
-                font_style='Body1',
-                size_hint_y=None,
-                height=dp(70)
-            )
-            empty_card.add_widget(empty_label)
-            history_layout.add_widget(empty_card)
+        token = self.get_token()
+        if not token:
+            self.show_error_dialog("Lỗi", "Bạn chưa đăng nhập")
             return
 
-        for item in history:
-            card = self.create_history_card(item)
-            history_layout.add_widget(card)
-
-    def create_history_card(self, item):
-        card = MDCard(
-            orientation='vertical',
-            padding=dp(12),
-            spacing=dp(8),
-            size_hint_y=None,
-            height=dp(230),
-            elevation=3,
-            radius=[12, 12, 12, 12]
-        )
+        user_id = (session_store.user or {}).get('id_user')
+        if user_id != self.history_user:
+            self.history_user = user_id
+            self.update_history(None)
 
-        name_label = MDLabel(
-            text=item.get('exam_name', 'Đề thi'),
-            font_style='H6',
-            bold=True,
-            size_hint_y=None,
-            height=dp(30)
-        )
-        card.add_widget(name_label)
+        if self.history is None and user_id is not None:
+            # Lần đầu vào màn hình: đọc bản lưu cục bộ trong worker, hiển thị rồi mới đồng bộ
+            def _show_local(cached):
+                if cached:
+                    self.update_history(cached)
+                self._sync(token, user_id)
 
-        score = item.get('score', 0)
-        if score >= 80:
-            score_color = [0.2, 0.8, 0.2, 1]
-        elif score >= 50:
-            score_color = [0.2, 0.6, 1, 1]
+            self.tasks.submit(lambda: local_db.history(user_id), key='history', on_success=_show_local)
         else:
-            score_color = [0.8, 0.2, 0.2, 1]
-
-        score_label = MDLabel(
-            text=f"Điểm: {score}/100",
-            font_style='H6',
-            theme_text_color='Custom',
-            text_color=score_color,
-            size_hint_y=None,
-            height=dp(30)
-        )
-        card.add_widget(score_label)
-
-        total_correct = item.get('total_correct')
-        total_q = item.get('total_ques')
-        correct_label = MDLabel(
-            text=f"Số câu đúng: {total_correct}/{total_q}",
-            font_style='Subtitle1',
-            size_hint_y=None,
-            height=dp(25)
+            # Đã có danh sách trên màn hình: giữ nguyên (cả vị trí cuộn), đồng bộ ở nền
+            self._sync(token, user_id)
+
+    def _sync(self, token, user_id):
+        def _loaded(history):
+            if history != self.history:
+                self.update_history(history)
+
+        def _failed(e):
+            logging.error(f"Error loading history: {e}")
+            if not self.history:
+                self.show_error_dialog("Lỗi", str(e))
+
+        self.tasks.submit(
+            lambda: self._sync_history(token, user_id),
+            key='history', on_success=_loaded, on_error=_failed
         )
-        card.add_widget(correct_label)
 
-        category_label = MDLabel(
-            text=f"Danh mục: {item.get('class_name', 'N/A')}",
-            font_style='Body2',
-            size_hint_y=None,
-            height=dp(25)
-        )
-        card.add_widget(category_label)
+    def _sync_history(self, token, user_id):
+        """Chạy trong worker; trả về danh sách lịch sử đầy đủ sau khi đồng bộ
+
+        Có cursor (bài mới nhất đã lưu) thì chỉ xin các bài mới hơn và gộp vào bản
+        lưu. Đồng bộ toàn bộ không gửi `limit`: server không trả `has_more` thì phản
+        hồi chắc chắn là cả danh sách, có `has_more` thì đi tiếp từng trang; chỉ khi
+        đó mới thay bản lưu, tránh xóa nhầm các bài nằm ngoài một trang bị cắt.
+        """
+        cursor = None
+        if user_id is not None:
+            synced_at = local_db.synced_at(f"history:{user_id}")
+            if synced_at and time.time() - synced_at < HISTORY_FULL_SYNC_INTERVAL:
+                cursor = local_db.history_cursor(user_id)
+
+        params = {}
+        if cursor:
+            params = {'limit': HISTORY_PAGE_SIZE}
+            params['since_time'], params['since_id'] = cursor
+        rows = self._fetch_history_pages(token, params)
+
+        if user_id is None:
+            return rows
+        if cursor:
+            # Server cũ bỏ qua tham số delta sẽ trả cả danh sách, gộp vào vẫn đúng
+            if rows:
+                local_db.merge_history(user_id, rows)
+        else:
+            local_db.replace_history(user_id, rows)
+        return local_db.history(user_id)
+
+    def _fetch_history_pages(self, token, params):
+        """Tải lần lượt các trang khi server báo còn (`has_more`)"""
+        rows = []
+        while True:
+            res = api.get(
+                f"{API_PATH}/exam/history",
+                token=token,
+                params=params,
+                timeout=10,
+                hedge=True
+            )
 
-        try:
-            date_str = str(item.get('completed_time') or item.get('created_at', ''))[:19]
-            date_label_text = f"Ngày làm: {date_str}"
-        except:
-            date_label_text = "Ngày làm: N/A"
-
-        date_label = MDLabel(
-            text=date_label_text,
-            font_style='Caption',
-            size_hint_y=None,
-            height=dp(20)
-        )
-        card.add_widget(date_label)
-
-        detail_button = MDRaisedButton(
-            text='Xem chi tiết',
-            size_hint_x=1,
-            size_hint_y=None,
-            height=dp(44),
-            md_bg_color=[0.2, 0.6, 1, 1],
-            on_release=lambda x, result_id=item.get('id_result'): self.view_detail(result_id)
-        )
-        card.add_widget(detail_button)
+            if res.status_code != 200:
+                try:
+                    msg = res.json().get('message', res.text)
+                except Exception:
+                    msg = res.text
+                raise Exception(msg)
+
+            data = res.json()
+            if not data.get('success'):
+                raise Exception(data.get('message', 'Lỗi server'))
+
+            page = data.get('history', [])
+            rows.extend(page)
+            if not data.get('has_more') or not page:
+                return rows
+            params = dict(params, cursor=data.get('next_cursor') or page[-1].get('id_result'))
+
+    def update_history(self, history):
+        """Cập nhật RecycleView theo khóa id_result: chỉ chèn/sửa/xóa các dòng thay đổi"""
+        self.history = history
+        self.empty = history is not None and not history
+        rows = [history_row(item) for item in history or []]
+        data = self.ids.history_list.data
+        if not data or not rows:
+            self.ids.history_list.data = rows
+            return
 
-        return card
+        keys = {row['id_result'] for row in rows}
+        for i in range(len(data) - 1, -1, -1):
+            if data[i]['id_result'] not in keys:
+                del data[i]
+
+        present = {row['id_result'] for row in data}
+        for i, row in enumerate(rows):
+            key = row['id_result']
+            if i < len(data) and data[i]['id_result'] == key:
+                if data[i] != row:
+                    data[i] = row
+                continue
+            if key in present:
+                # Dòng đổi vị trí: bỏ bản cũ rồi chèn lại đúng chỗ
+                del data[next(j for j in range(i, len(data)) if data[j]['id_result'] == key)]
+            data.insert(i, row)
 
     def view_detail(self, result_id):
         try:
@@ -228,11 +335,9 @@ class ExamHistoryScreen(MDScreen):
 
     def get_token(self):
         try:
-            from kivy.storage.jsonstore import JsonStore
-            store = JsonStore('user.json')
             for key in ('auth', 'token', 'user'):
-                if store.exists(key):
-                    d = store.get(key)
+                if session_store.exists(key):
+                    d = session_store.get(key)
                     token = d.get('token') or d.get('access_token') or (d if isinstance(d, str) else None)
                     if token:
                         return token
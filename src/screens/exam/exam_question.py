@@ -1,19 +1,96 @@
-import requests
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.button import MDRaisedButton, MDFlatButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.card import MDCard
-from kivymd.uix.label import MDLabel
-from kivymd.uix.selectioncontrol import MDCheckbox
 from kivy.lang import Builder
 from kivy.metrics import dp
 from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.properties import ListProperty, NumericProperty, ObjectProperty, StringProperty
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from datetime import datetime, timedelta
 import logging
 
-API_URL = "https://backend-onlinesystem.onrender.com/api/exam"
+from ...components.cached_label import CachedLabel  # dùng trong KV
+from ...components.incremental import IncrementalBuilder
+from ...services.answer_journal import answer_journal
+from ...services.api_client import api
+from ...services.outbox import outbox, STATUS_SENT, STATUS_RETRYING, STATUS_AUTH
+from ...services.session_store import session_store
+from ...services.task_runner import TaskGroup
+from ...services.text_measure import text_measure
+from ...services.warmup import warmer
+
+API_PATH = "/api/exam"
+OPTION_KEYS = ['a', 'b', 'c', 'd']
+
+# Khoảng cách cố định của QuestionCard, dùng để tính chiều cao dòng
+SCREEN_PADDING = dp(15)
+LIST_PADDING = dp(10)
+CARD_PADDING = dp(15)
+CARD_SPACING = dp(10)
+HEADER_HEIGHT = dp(30)
+ROW_PADDING = dp(5)
+CHECKBOX_SIZE = dp(40)
 
 Builder.load_string("""
+<AnswerRow>:
+    orientation: 'horizontal'
+    size_hint_y: None
+    opacity: 1 if self.text else 0
+    disabled: not self.text
+    padding: dp(5)
+
+    MDCheckbox:
+        id: checkbox
+        size_hint: None, None
+        size: dp(40), dp(40)
+        on_release: root.parent.select_option(root.option)
+
+    CachedLabel:
+        text: '[b]{}.[/b] {}'.format(root.option.upper(), root.text) if root.text else ''
+        markup: True
+        font_style: 'Body1'
+        size_hint_y: None
+        adaptive_height: True
+
+<QuestionCard>:
+    orientation: 'vertical'
+    padding: dp(15)
+    spacing: dp(10)
+    elevation: 3
+    radius: [15, 15, 15, 15]
+
+    MDLabel:
+        text: '[b]Câu {}:[/b]'.format(root.number)
+        markup: True
+        font_style: 'H6'
+        size_hint_y: None
+        height: dp(30)
+
+    CachedLabel:
+        text: root.ques_text
+        font_style: 'Body1'
+        size_hint_y: None
+        height: root.ques_height
+
+    AnswerRow:
+        id: opt_a
+        option: 'a'
+
+    AnswerRow:
+        id: opt_b
+        option: 'b'
+
+    AnswerRow:
+        id: opt_c
+        option: 'c'
+
+    AnswerRow:
+        id: opt_d
+        option: 'd'
+
 <ExamQuestionScreen>:
     MDBoxLayout:
         orientation: 'vertical'
@@ -59,17 +136,20 @@ Builder.load_string("""
                 theme_text_color: 'Custom'
                 text_color: 1, 1, 1, 0.9
 
-        # Questions Container
-        ScrollView:
+        # Questions Container (chỉ tạo đủ card cho phần đang hiển thị)
+        QuestionList:
             id: scroll_view
+            screen: root
+            viewclass: 'QuestionCard'
 
-            MDBoxLayout:
-                id: questions_container
+            RecycleBoxLayout:
+                default_size: None, dp(300)
+                default_size_hint: 1, None
+                size_hint_y: None
+                height: self.minimum_height
                 orientation: 'vertical'
                 spacing: dp(20)
                 padding: dp(10)
-                size_hint_y: None
-                height: self.minimum_height
 
         # Navigation Buttons
         MDBoxLayout:
@@ -91,6 +171,56 @@ Builder.load_string("""
                 on_release: root.confirm_submit()
 """)
 
+
+class AnswerRow(MDCard):
+    option = StringProperty('')
+    text = StringProperty('')
+
+
+class QuestionCard(RecycleDataViewBehavior, MDCard):
+    """Card câu hỏi được tái sử dụng, trạng thái chọn lấy từ model chứ không giữ trong widget
+
+    Chiều cao câu hỏi và từng đáp án đã đo sẵn trong data (xem `question_row`).
+    """
+    index = NumericProperty(0)
+    question_id = ObjectProperty(None, allownone=True)
+    number = NumericProperty(0)
+    ques_text = StringProperty('')
+    ques_height = NumericProperty(0)
+    options = ListProperty(['', '', '', ''])
+    option_heights = ListProperty([0, 0, 0, 0])
+    selected = StringProperty('')
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rv = None
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.rv = rv
+        self.index = index
+        super().refresh_view_attrs(rv, index, data)
+        self._sync_rows()
+
+    def _sync_rows(self):
+        for opt, text, height in zip(OPTION_KEYS, self.options, self.option_heights):
+            row = self.ids[f"opt_{opt}"]
+            row.text = text or ''
+            row.height = height
+            row.ids.checkbox.active = bool(text) and text == self.selected
+
+    def select_option(self, option):
+        answer = self.options[OPTION_KEYS.index(option)]
+        if not answer or self.rv is None:
+            return
+        self.selected = answer
+        self.rv.screen.on_answer_selected(self.question_id, answer, True)
+        self._sync_rows()
+
+
+class QuestionList(RecycleView):
+    screen = ObjectProperty(None)
+
+
 class ExamQuestionScreen(MDScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -102,20 +232,36 @@ class ExamQuestionScreen(MDScreen):
         self.end_time = None
         self.timer_event = None
         self.dialog = None
-        self.question_widgets = []
+        self.question_index = {}
+        self.submission_id = None
         self.duration = 30
-
-    def set_exam(self, exam_data):
-        """Thiết lập dữ liệu cho bài thi"""
+        self.questions = []
+        self.label_width = None
+        self.tasks = TaskGroup('exam_question')
+        self.builder = None
+        self._remeasure_trigger = Clock.create_trigger(lambda dt: self.remeasure(), 0.1)
+        self.ids.scroll_view.bind(width=lambda *args: self._remeasure_trigger())
+
+    def set_exam(self, exam_data, session=None):
+        """Thiết lập dữ liệu cho bài thi (session: phiên khôi phục từ nhật ký)"""
         exam_info = exam_data.get("exam", {})
         self.exam_id = exam_info.get("id_ex")
         self.exam_name = exam_info.get("name_ex", "Bài thi")
         self.total_questions = exam_info.get("total_ques") or len(exam_data.get('questions', []))
         self.duration = exam_info.get("duration", 30)
         self.questions = exam_data.get("questions", [])
-        self.answers = {}
-        self.start_time = datetime.now()
-        self.end_time = self.start_time + timedelta(minutes=self.duration)
+        self.submission_id = None
+
+        if session:
+            self.answers = dict(session['answers'])
+            self.start_time = datetime.fromisoformat(session['start_time'])
+            self.end_time = datetime.fromisoformat(session['end_time'])
+            answer_journal.resume(session)
+        else:
+            self.answers = {}
+            self.start_time = datetime.now()
+            self.end_time = self.start_time + timedelta(minutes=self.duration)
+            answer_journal.begin(exam_data, self.start_time, self.end_time)
 
         if not self.questions:
             self.load_all_questions()
@@ -127,6 +273,13 @@ class ExamQuestionScreen(MDScreen):
             }), 0)
 
         self.start_timer()
+        # Giữ backend thức suốt bài thi để lúc nộp không gặp server đang ngủ
+        warmer.start_keepalive()
+
+    def resume_session(self, session):
+        """Tiếp tục bài thi dang dở: khôi phục đáp án và thời gian còn lại"""
+        logging.info(f"Khôi phục bài thi dang dở ({len(session['answers'])} câu đã trả lời)")
+        self.set_exam(session['exam'], session=session)
 
     def start_timer(self):
         """Bắt đầu đếm thời gian"""
@@ -152,108 +305,120 @@ class ExamQuestionScreen(MDScreen):
         self.timer_event = Clock.schedule_interval(update_timer, 1)
 
     def load_all_questions(self):
-        """Lấy câu hỏi từ backend"""
-        try:
-            token = self.get_token()
-            if not token:
-                self.show_error_dialog("Lỗi", "Token không hợp lệ!")
-                return
-
-            res = requests.get(
-                f"{API_URL}/exams/{self.exam_id}/detail",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=10
+        """Lấy câu hỏi từ backend trong worker, hiển thị khi xong"""
+        token = self.get_token()
+        if not token:
+            self.show_error_dialog("Lỗi", "Token không hợp lệ!")
+            return
+
+        exam_id = self.exam_id
+
+        def _load():
+            res = api.get(
+                f"{API_PATH}/exams/{exam_id}/detail",
+                token=token,
+                timeout=10,
+                hedge=True
             )
             data = res.json()
             if res.status_code == 200 and data.get('success'):
-                self.questions = data.get('questions', [])
-                Clock.schedule_once(lambda dt: self.display_all_questions(data), 0)
-            else:
-                self.show_error_dialog("Lỗi", data.get('message', 'Không tải được câu hỏi'))
-        except Exception as e:
+                return data
+            raise Exception(data.get('message', 'Không tải được câu hỏi'))
+
+        def _failed(e):
             logging.error(f"Error loading questions: {e}")
             self.show_error_dialog("Lỗi", f"Lỗi khi tải câu hỏi: {str(e)}")
 
+        self.tasks.submit(_load, key='questions', on_success=self.display_all_questions, on_error=_failed)
+
     def display_all_questions(self, data):
         exam_info = data.get('exam', {})
         questions = data.get('questions', [])
 
+        self.questions = questions
         self.total_questions = len(questions)
         if hasattr(self.ids, 'exam_name_label'):
             self.ids.exam_name_label.text = exam_info.get('name_ex', 'Bài thi')
             self.ids.progress_label.text = f"Tổng số câu: {self.total_questions}"
 
-        container = self.ids.questions_container
-        container.clear_widgets()
-        self.question_widgets = []
-
-        for idx, question in enumerate(questions):
-            question_card = self.create_question_card(question, idx + 1)
-            container.add_widget(question_card)
-            self.question_widgets.append(question_card)
-
-    def create_question_card(self, question, question_number):
-        """Tạo card cho mỗi câu hỏi"""
-        card = MDCard(
-            orientation='vertical',
-            padding=dp(15),
-            spacing=dp(10),
-            size_hint_y=None,
-            height=dp(300),
-            elevation=3,
-            radius=[15, 15, 15, 15]
-        )
-
-        header = MDLabel(
-            text=f"[b]Câu {question_number}:[/b]",
-            markup=True,
-            font_style='H6',
-            size_hint_y=None,
-            height=dp(30)
-        )
-        card.add_widget(header)
-
-        question_text = MDLabel(
-            text=question.get('ques_text', ''),
-            font_style='Body1',
-            size_hint_y=None,
-            height=dp(50),
-            adaptive_height=True
-        )
-        card.add_widget(question_text)
-
-        for opt in ['a', 'b', 'c', 'd']:
-            ans = question.get(f"ans_{opt}")
-            if ans:
-                answer_box = MDCard(
-                    orientation='horizontal',
-                    size_hint_y=None,
-                    height=dp(40),
-                    padding=dp(5)
-                )
-                checkbox = MDCheckbox(
-                    size_hint=(None, None),
-                    size=(dp(40), dp(40)),
-                    group=f"q_{question.get('id_ques')}"
-                )
-                checkbox.bind(
-                    active=lambda cb, val, qid=question.get('id_ques'), answer=ans:
-                    self.on_answer_selected(qid, answer, val)
-                )
-                label = MDLabel(
-                    text=f"[b]{opt.upper()}.[/b] {ans}",
-                    markup=True,
-                    adaptive_height=True
-                )
-                answer_box.add_widget(checkbox)
-                answer_box.add_widget(label)
-                card.add_widget(answer_box)
-
-        return card
+        self.question_index = {question.get('id_ques'): idx for idx, question in enumerate(questions)}
+        self.label_width = self._label_width()
+        self.ids.scroll_view.data = []
+        self.ids.scroll_view.scroll_y = 1
+        self._measure_rows()
+
+    def _measure_rows(self):
+        """Đo chữ rải qua nhiều frame, các câu đầu có ngay"""
+        if self.builder:
+            self.builder.cancel()
+        width = self.label_width
+        self.builder = IncrementalBuilder(
+            None, self.questions,
+            lambda question, idx: self.question_row(question, idx, width),
+            add=self._put_row
+        ).start()
+
+    def _put_row(self, row):
+        data = self.ids.scroll_view.data
+        index = row['number'] - 1
+        if index < len(data):
+            data[index] = row
+        else:
+            data.append(row)
+
+    def _label_width(self):
+        scroll_view = self.ids.scroll_view
+        # Màn hình chưa hiển thị thì RecycleView chưa có kích thước thật, ước lượng theo cửa sổ
+        list_width = scroll_view.width if scroll_view.get_root_window() else Window.width - 2 * SCREEN_PADDING
+        return int(list_width - 2 * LIST_PADDING - 2 * CARD_PADDING)
+
+    def remeasure(self):
+        """Bề rộng thay đổi (xoay màn hình, đổi cỡ cửa sổ): đo lại chiều cao từng câu"""
+        if not self.questions or not self.ids.scroll_view.get_root_window():
+            return
+        width = self._label_width()
+        if width == self.label_width:
+            return
+        self.label_width = width
+        self._measure_rows()
+
+    def question_row(self, question, idx, width):
+        """Dữ liệu cho QuestionCard, chiều cao lấy từ đo chữ thật"""
+        question_id = question.get('id_ques')
+        ques_text = question.get('ques_text', '') or ''
+        options = [question.get(f"ans_{opt}") or '' for opt in OPTION_KEYS]
+
+        option_width = width - 2 * ROW_PADDING - CHECKBOX_SIZE
+        option_heights = [
+            max(
+                CHECKBOX_SIZE,
+                text_measure.height(f"[b]{opt.upper()}.[/b] {text}", option_width, 'Body1', markup=True)
+                + 2 * ROW_PADDING
+            ) if text else 0
+            for opt, text in zip(OPTION_KEYS, options)
+        ]
+        ques_height = text_measure.height(ques_text, width, 'Body1')
+
+        heights = [HEADER_HEIGHT, ques_height] + option_heights
+        return {
+            'question_id': question_id,
+            'number': idx + 1,
+            'ques_text': ques_text,
+            'ques_height': ques_height,
+            'options': options,
+            'option_heights': option_heights,
+            'selected': self.answers.get(question_id, ''),
+            'height': sum(heights) + CARD_SPACING * (len(heights) - 1) + 2 * CARD_PADDING,
+        }
 
     def on_answer_selected(self, question_id, answer, is_active):
         if is_active:
             self.answers[question_id] = answer
+            answer_journal.record_answer(question_id, answer)
+            idx = self.question_index.get(question_id)
+            # Câu chưa đo xong sẽ lấy lựa chọn từ self.answers khi được thêm vào
+            if idx is not None and idx < len(self.ids.scroll_view.data):
+                self.ids.scroll_view.data[idx]['selected'] = answer
             answered = len(self.answers)
             if hasattr(self.ids, 'progress_label'):
                 self.ids.progress_label.text = f"Tổng số câu: {answered}/{self.total_questions}"
@@ -296,74 +461,86 @@ class ExamQuestionScreen(MDScreen):
         if self.dialog:
             self.dialog.dismiss()
 
-        if self.timer_event:
-            self.timer_event.cancel()
+        if self.submission_id:
+            return
 
         try:
-            token = self.get_token()
-            if not token:
-                self.show_error_dialog("Lỗi 401", "Bạn chưa đăng nhập hoặc token không hợp lệ.")
-                return
-
             if not self.exam_id:
                 self.show_error_dialog("Lỗi", "Không có thông tin đề thi")
                 return
 
+            if self.timer_event:
+                self.timer_event.cancel()
+
             answers_list = [
                 {"id_ques": qid, "answer": ans}
                 for qid, ans in self.answers.items()
             ]
 
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json"
-            }
-
-            res = requests.post(
-                f"{API_URL}/exams/{self.exam_id}/submit",
-                json={
-                    "answers": answers_list,
-                    "start_time": self.start_time.isoformat()
-                },
-                headers=headers,
-                timeout=10
-            )
+            # Ghi bài làm xuống đĩa trước, việc gửi lên server chạy ngầm và tự thử lại.
+            # Chưa đăng nhập/token bị từ chối thì outbox giữ bài ở trạng thái AUTH và gửi
+            # lại sau khi đăng nhập (on_submission_update báo cho người dùng)
+            entry = outbox.enqueue(self.exam_id, {
+                "answers": answers_list,
+                "start_time": self.start_time.isoformat()
+            })
+            self.submission_id = entry['id']
+            answer_journal.finish()
+            self.show_submitting_dialog("Đang nộp bài...")
+            outbox.send(entry['id'], listener=self.on_submission_update)
 
-            try:
-                data = res.json()
-            except Exception:
-                data = {"success": False, "message": "Backend không trả dữ liệu hợp lệ"}
+        except Exception as e:
+            logging.error(f"Error submitting exam: {e}")
+            self.show_error_dialog("Lỗi", f"Lỗi khi nộp bài: {str(e)}")
 
-            if res.status_code == 200 and data.get('success'):
-                result = data.get('result')
+    def on_submission_update(self, entry, result, error):
+        if entry['id'] != self.submission_id:
+            return
+
+        status = entry['status']
+        if status == STATUS_SENT:
+            if self.dialog:
+                self.dialog.dismiss()
+            if self.manager and self.manager.current == self.name:
                 result_screen = self.manager.get_screen('exam_result')
                 result_screen.display_result(result)
                 self.manager.current = 'exam_result'
-            elif res.status_code == 401:
-                self.show_error_dialog("Lỗi 401", "Token hết hạn hoặc không hợp lệ. Vui lòng đăng nhập lại.")
-            else:
-                msg = data.get('message', f"Nộp bài thất bại ({res.status_code})")
-                self.show_error_dialog("Lỗi", msg)
+        elif status == STATUS_RETRYING:
+            self.show_submitting_dialog(
+                f"Bài làm đã được lưu trên máy.\nĐang thử gửi lại (lần {entry['attempts']})..."
+            )
+        elif status == STATUS_AUTH:
+            self.show_error_dialog("Lỗi 401", f"{error}\nBài làm đã được lưu và sẽ được gửi lại sau khi đăng nhập.")
+        else:
+            self.show_error_dialog("Lỗi", error)
 
-        except Exception as e:
-            logging.error(f"Error submitting exam: {e}")
-            self.show_error_dialog("Lỗi", f"Lỗi khi nộp bài: {str(e)}")
+    def show_submitting_dialog(self, message):
+        if self.dialog:
+            self.dialog.dismiss()
+        self.dialog = MDDialog(
+            title="Nộp bài",
+            text=message,
+            auto_dismiss=False,
+            buttons=[MDFlatButton(text="Về trang chủ", on_release=lambda x: self.leave_while_submitting())]
+        )
+        self.dialog.open()
+
+    def leave_while_submitting(self):
+        """Bài nộp vẫn tiếp tục gửi ngầm sau khi rời màn hình"""
+        if self.dialog:
+            self.dialog.dismiss()
+        self.manager.current = 'home'
 
     def on_leave(self):
         if self.timer_event:
             self.timer_event.cancel()
+        warmer.stop_keepalive()
+        self.tasks.cancel_all()
+        if self.builder:
+            self.builder.cancel()
 
     def get_token(self):
-        try:
-            from kivy.storage.jsonstore import JsonStore
-            store = JsonStore('user.json')
-            if store.exists('auth'):
-                auth_data = store.get('auth')
-                return auth_data.get('token')
-            return None
-        except Exception as e:
-            print(f"❌ Error getting token: {e}")
-            return None
+        return session_store.token
 
     def show_error_dialog(self, title, message):
         if self.dialog:
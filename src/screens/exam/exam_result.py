@@ -1,4 +1,3 @@
-import requests
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.button import MDFlatButton, MDRaisedButton
 from kivymd.uix.card import MDCard
@@ -8,7 +7,7 @@ from kivy.lang import Builder
 from kivy.metrics import dp
 import logging
 
-API_URL = "https://backend-onlinesystem.onrender.com/api/exam"
+from ...services.session_store import session_store
 
 Builder.load_string("""
 <ExamResultScreen>:
@@ -48,29 +47,6 @@ class ExamResultScreen(MDScreen):
         self.dialog = None
         self.result_data = None
 
-    def load_result(self, result_id):
-        """Load thông tin bài làm vừa hoàn thành"""
-        try:
-            token = self.get_token()
-            if not token:
-                raise Exception("Chưa đăng nhập")
-
-            res = requests.get(
-                f"{API_URL}/result/{result_id}/detail",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=10
-            )
-            data = res.json()
-            if res.status_code == 200 and data.get("success"):
-                result = data.get("result")
-                self.result_data = result
-                self.display_result(result)
-            else:
-                self.show_error_dialog("Lỗi", data.get("message", "Không tải được kết quả"))
-        except Exception as e:
-            logging.error(f"Error loading result: {e}")
-            self.show_error_dialog("Lỗi", str(e))
-
     def display_result(self, result):
         layout = self.ids.result_layout
         layout.clear_widgets()
@@ -150,14 +126,7 @@ class ExamResultScreen(MDScreen):
         self.manager.current = 'home'
 
     def get_token(self):
-        try:
-            from kivy.storage.jsonstore import JsonStore
-            store = JsonStore('user.json')
-            if store.exists('auth'):
-                return store.get('auth').get('token')
-            return None
-        except:
-            return None
+        return session_store.token
 
     def show_error_dialog(self, title, message):
         if self.dialog:
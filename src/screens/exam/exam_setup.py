@@ -1,4 +1,3 @@
-import requests
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
@@ -11,10 +10,24 @@ from kivymd.uix.spinner import MDSpinner
 from kivy.uix.modalview import ModalView
 from kivy.metrics import dp
 from kivy.properties import NumericProperty, BooleanProperty
-from kivy.clock import Clock
-import threading
 
-API_URL = "https://backend-onlinesystem.onrender.com/api/exam"
+import time
+
+import requests
+
+from ...services.api_client import api
+from ...services.exam_packs import exam_packs
+from ...services.local_db import local_db
+from ...services.prefetch import prefetcher, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from ...services.response_cache import response_cache
+from ...services.session_store import session_store
+from ...services.task_runner import TaskGroup
+
+API_PATH = "/api/exam"
+# Danh mục môn/lớp/đề hầu như không đổi nên giữ lâu, hết hạn thì revalidate ngầm
+CATALOG_TTL = 6 * 60 * 60
+# Số môn học đầu danh sách được tải trước danh sách lớp
+PREFETCH_TOP_DEPARTMENTS = 3
 
 
 class ExamSetupScreen(MDScreen):
@@ -36,6 +49,7 @@ class ExamSetupScreen(MDScreen):
         self.difficulty_menu = None
         self.dialog = None
         self.loading_modal = None
+        self.tasks = TaskGroup('exam_setup')
         self.difficulty_options = [
             {"id": 1, "name": "Dễ"},
             {"id": 2, "name": "Trung bình"},
@@ -232,7 +246,7 @@ class ExamSetupScreen(MDScreen):
             padding=dp(20),
             spacing=dp(12),
             size_hint_y=None,
-            height=dp(120),
+            height=dp(182),
             radius=[20],
             md_bg_color=(0.98, 0.98, 0.99, 1),
             shadow_softness=8,
@@ -260,8 +274,20 @@ class ExamSetupScreen(MDScreen):
         )
         self.exam_button.font_size = dp(15)
 
+        # Tải đề về máy để vẫn làm bài được khi mất mạng
+        self.pack_button = MDRaisedButton(
+            text="Tải đề về máy (làm offline)",
+            md_bg_color=(0.12, 0.45, 0.75, 1),
+            size_hint=(1, None),
+            height=dp(44),
+            elevation=2,
+            disabled=True,
+            on_release=lambda x: self.download_exam_pack()
+        )
+
         card.add_widget(label)
         card.add_widget(self.exam_button)
+        card.add_widget(self.pack_button)
 
         return card
 
@@ -280,6 +306,11 @@ class ExamSetupScreen(MDScreen):
     def on_enter(self):
         self.load_departments()
 
+    def on_leave(self):
+        self.tasks.cancel_all()
+        prefetcher.cancel_pending()
+        self.hide_loading()
+
     def show_loading(self, message="Đang tải..."):
         if self.loading_modal is None:
             self.loading_modal = ModalView(
@@ -328,35 +359,103 @@ class ExamSetupScreen(MDScreen):
         if self.loading_modal:
             self.loading_modal.dismiss()
 
-    def load_departments(self):
-        self.show_loading("Đang tải danh sách môn học...")
+    def _load_catalog(self, task_key, path, field, loading_message, error_message, on_loaded,
+                      read_local, write_local, params=None):
+        """Hiển thị ngay bản lưu trong CSDL cục bộ, chỉ đồng bộ lại ngầm khi đã cũ"""
+        cache_key = response_cache.make_key(path, params)
+        rows, synced_at = read_local()
+        if rows is not None:
+            on_loaded(rows)
+            if time.time() - synced_at < CATALOG_TTL:
+                self.tasks.cancel(task_key)
+                return
+        else:
+            self.show_loading(loading_message)
 
         def _load():
-            try:
-                res = requests.get(f"{API_URL}/departments", timeout=10)
-                if res.status_code == 200:
-                    data = res.json()
-                    self.departments = data.get('departments', [])
-                    print(f"✅ Loaded {len(self.departments)} departments")
-                else:
-                    Clock.schedule_once(
-                        lambda dt: self.show_error_dialog(
-                            "Lỗi",
-                            f"Không tải được danh sách môn học"
-                        )
-                    )
-            except Exception as e:
-                print(f"❌ Error: {e}")
-                Clock.schedule_once(
-                    lambda dt: self.show_error_dialog(
-                        "Lỗi kết nối",
-                        f"Không thể kết nối đến server:\n{str(e)}"
-                    )
-                )
-            finally:
-                Clock.schedule_once(lambda dt: self.hide_loading())
+            # Dùng lại kết quả tải trước nếu đã có hoặc đang tải dở
+            data = prefetcher.get(cache_key, timeout=10)
+            if data is None:
+                data = api.get_cached(path, params=params, ttl=CATALOG_TTL, timeout=10, hedge=True)
+            items = data.get(field, [])
+            write_local(items)
+            return items
+
+        def _done(items):
+            if items != rows:
+                on_loaded(items)
+
+        def _failed(e):
+            print(f"❌ Error: {e}")
+            if rows is not None:
+                return
+            if isinstance(e, requests.HTTPError):
+                self.show_error_dialog("Lỗi", error_message)
+            else:
+                self.show_error_dialog("Lỗi kết nối", f"Không thể kết nối đến server:\n{str(e)}")
 
-        threading.Thread(target=_load, daemon=True).start()
+        self.tasks.submit(_load, key=task_key, on_success=_done, on_error=_failed, on_finally=self.hide_loading)
+
+    def _prefetch_catalog(self, path, field, scope, write_local, params=None, priority=PRIORITY_LOW):
+        """Tải trước vào CSDL cục bộ để `_load_catalog` đọc được ngay, bỏ qua nếu bản lưu còn mới"""
+        synced_at = local_db.synced_at(scope)
+        if synced_at is not None and time.time() - synced_at < CATALOG_TTL:
+            return
+
+        def _fetch():
+            data = api.get_cached(path, params=params, ttl=CATALOG_TTL, timeout=10)
+            write_local(data.get(field, []))
+            return data
+
+        prefetcher.prefetch(response_cache.make_key(path, params), _fetch, priority=priority)
+
+    def prefetch_classes(self):
+        """Tải trước danh sách lớp của môn vừa chọn và vài môn đầu danh sách"""
+        dept_ids = [dept['id_department'] for dept in self.departments[:PREFETCH_TOP_DEPARTMENTS]]
+        if self.selected_department_id and self.selected_department_id not in dept_ids:
+            dept_ids.insert(0, self.selected_department_id)
+        for dept_id in dept_ids:
+            self._prefetch_catalog(
+                f"{API_PATH}/departments/{dept_id}/classes", 'classes', f'classes:{dept_id}',
+                lambda items, dept_id=dept_id: local_db.put_classes(dept_id, items)
+            )
+
+    def prefetch_exams(self, class_id):
+        """Tải trước đề thi của cả 3 độ khó ngay khi chọn lớp"""
+        for diff in self.difficulty_options:
+            difficulty = diff['id']
+            self._prefetch_catalog(
+                f"{API_PATH}/classes/{class_id}/exams", 'exams', f'exams:{class_id}:{difficulty}',
+                lambda items, difficulty=difficulty: local_db.put_exams(class_id, difficulty, items),
+                params={'difficulty': difficulty},
+                priority=PRIORITY_NORMAL
+            )
+
+    def prefetch_exam_detail(self, exam_id):
+        token = self.get_token()
+        if not token:
+            return
+
+        def _fetch():
+            res = api.get(f"{API_PATH}/exams/{exam_id}/detail", token=token, timeout=15)
+            data = res.json()
+            if res.status_code == 200 and data.get("success"):
+                return data
+            return None
+
+        prefetcher.prefetch(f"exam_detail:{exam_id}", _fetch, priority=PRIORITY_HIGH)
+
+    def load_departments(self):
+        def _loaded(departments):
+            self.departments = departments
+            print(f"✅ Loaded {len(self.departments)} departments")
+            self.prefetch_classes()
+
+        self._load_catalog(
+            'departments', f"{API_PATH}/departments", 'departments',
+            "Đang tải danh sách môn học...", "Không tải được danh sách môn học", _loaded,
+            local_db.departments, local_db.put_departments
+        )
 
     def show_department_menu(self):
         if not self.departments:
@@ -400,31 +499,23 @@ class ExamSetupScreen(MDScreen):
         self.exam_button.disabled = True
         self.exam_button.md_bg_color = (0.5, 0.5, 0.55, 1)
 
+        # Danh sách lớp/đề cũ không còn đúng với môn mới
+        self.classes = []
+        self.exams = []
+        self.tasks.cancel('exams')
         self.load_classes(self.selected_department_id)
 
     def load_classes(self, dept_id):
-        self.show_loading("Đang tải danh sách lớp học...")
-
-        def _load():
-            try:
-                res = requests.get(f"{API_URL}/departments/{dept_id}/classes", timeout=10)
-                if res.status_code == 200:
-                    data = res.json()
-                    self.classes = data.get('classes', [])
-                    print(f"✅ Loaded {len(self.classes)} classes")
-                else:
-                    Clock.schedule_once(
-                        lambda dt: self.show_error_dialog("Lỗi", "Không tải được danh sách lớp học")
-                    )
-            except Exception as e:
-                print(f"❌ Error: {e}")
-                Clock.schedule_once(
-                    lambda dt: self.show_error_dialog("Lỗi", str(e))
-                )
-            finally:
-                Clock.schedule_once(lambda dt: self.hide_loading())
-
-        threading.Thread(target=_load, daemon=True).start()
+        def _loaded(classes):
+            self.classes = classes
+            print(f"✅ Loaded {len(self.classes)} classes")
+
+        self._load_catalog(
+            'classes', f"{API_PATH}/departments/{dept_id}/classes", 'classes',
+            "Đang tải danh sách lớp học...", "Không tải được danh sách lớp học", _loaded,
+            lambda: local_db.classes(dept_id),
+            lambda items: local_db.put_classes(dept_id, items)
+        )
 
     def show_class_menu(self):
         if not self.classes:
@@ -463,6 +554,10 @@ class ExamSetupScreen(MDScreen):
         self.exam_button.disabled = True
         self.exam_button.md_bg_color = (0.5, 0.5, 0.55, 1)
 
+        self.exams = []
+        self.tasks.cancel('exams')
+        self.prefetch_exams(self.selected_class_id)
+
     def show_difficulty_menu(self):
         menu_items = [
             {
@@ -497,38 +592,24 @@ class ExamSetupScreen(MDScreen):
 
     def load_exams(self, class_id, difficulty=1):
         """Load đề thi theo class_id và difficulty"""
-        self.show_loading("Đang tải danh sách đề thi...")
-
-        def _load():
-            try:
-                # Gửi difficulty như một query parameter
-                res = requests.get(
-                    f"{API_URL}/classes/{class_id}/exams?difficulty={difficulty}",
-                    timeout=10
+        def _loaded(exams):
+            self.exams = exams
+            print(f"✅ Loaded {len(self.exams)} exams for difficulty {difficulty}")
+
+            if len(self.exams) == 0:
+                self.show_error_dialog(
+                    "Thông báo",
+                    "Chưa có đề thi nào cho độ khó này.\nVui lòng chọn độ khó khác."
                 )
-                if res.status_code == 200:
-                    data = res.json()
-                    self.exams = data.get('exams', [])
-                    print(f"✅ Loaded {len(self.exams)} exams for difficulty {difficulty}")
-
-                    if len(self.exams) == 0:
-                        Clock.schedule_once(
-                            lambda dt: self.show_error_dialog(
-                                "Thông báo",
-                                "Chưa có đề thi nào cho độ khó này.\nVui lòng chọn độ khó khác."
-                            )
-                        )
-                else:
-                    Clock.schedule_once(
-                        lambda dt: self.show_error_dialog("Lỗi", "Không tải được danh sách đề thi")
-                    )
-            except Exception as e:
-                print(f"❌ Error: {e}")
-                Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", str(e)))
-            finally:
-                Clock.schedule_once(lambda dt: self.hide_loading())
 
-        threading.Thread(target=_load, daemon=True).start()
+        # Gửi difficulty như một query parameter
+        self._load_catalog(
+            'exams', f"{API_PATH}/classes/{class_id}/exams", 'exams',
+            "Đang tải danh sách đề thi...", "Không tải được danh sách đề thi", _loaded,
+            lambda: local_db.exams(class_id, difficulty),
+            lambda items: local_db.put_exams(class_id, difficulty, items),
+            params={'difficulty': difficulty}
+        )
 
     def show_exam_menu(self):
         if not self.exams:
@@ -556,6 +637,39 @@ class ExamSetupScreen(MDScreen):
         self.exam_button.md_bg_color = (0.2, 0.7, 0.3, 1)
         self.exam_menu.dismiss()
         print(f"✅ Selected exam: {exam['name_ex']}")
+        if not exam_packs.has(self.selected_exam_id):
+            self.prefetch_exam_detail(self.selected_exam_id)
+
+    def on_selected_exam_id(self, instance, value):
+        self.update_pack_button()
+
+    def update_pack_button(self):
+        if not self.selected_exam_id:
+            self.pack_button.disabled = True
+            return
+        self.pack_button.disabled = False
+        if exam_packs.has(self.selected_exam_id):
+            self.pack_button.text = "Đã tải về máy - làm được khi mất mạng"
+        else:
+            self.pack_button.text = "Tải đề về máy (làm offline)"
+
+    def download_exam_pack(self):
+        token = self.get_token()
+        if not token:
+            self.show_error_dialog("Lỗi", "Bạn chưa đăng nhập!")
+            return
+
+        exam_id = self.selected_exam_id
+        self.show_loading("Đang tải đề về máy...")
+
+        def _done(data):
+            self.update_pack_button()
+
+        def _failed(e):
+            self.show_error_dialog("Lỗi", f"Không tải được đề về máy:\n{str(e)}")
+
+        self.tasks.submit(exam_packs.download, exam_id, token, key='exam_pack',
+                          on_success=_done, on_error=_failed, on_finally=self.hide_loading)
 
     def start_exam(self):
         if self.selected_department_id == 0:
@@ -570,61 +684,57 @@ class ExamSetupScreen(MDScreen):
             self.show_error_dialog("Thiếu thông tin", "Vui lòng chọn đề thi!")
             return
 
+        token = self.get_token()
+        if not token:
+            self.show_error_dialog("Lỗi", "Bạn chưa đăng nhập!")
+            return
+
         self.show_loading("Đang tải đề thi...")
+        exam_id = self.selected_exam_id
 
         def _load_exam():
-            try:
-                token = self.get_token()
-                if not token:
-                    Clock.schedule_once(
-                        lambda dt: self.show_error_dialog("Lỗi", "Bạn chưa đăng nhập!")
-                    )
-                    return
-
-                res = requests.get(
-                    f"{API_URL}/exams/{self.selected_exam_id}/detail",
-                    headers={"Authorization": f"Bearer {token}"},
-                    timeout=15
-                )
-
-                data = res.json()
-
-                if res.status_code == 200 and data.get("success"):
-                    exam_data = data
-
-                    def _go(dt):
-                        screen = self.manager.get_screen("exam_question")
-                        screen.set_exam(exam_data)
-                        self.manager.current = "exam_question"
-
-                    Clock.schedule_once(_go)
-
-                else:
-                    msg = data.get("message", "Không tải được đề thi")
-                    Clock.schedule_once(lambda dt: self.show_error_dialog("Lỗi", msg))
-
-            except Exception as e:
-                print("❌ Error:", e)
-                Clock.schedule_once(
-                    lambda dt: self.show_error_dialog("Lỗi", f"Không thể tải đề thi:\n{str(e)}")
-                )
+            # Đề đã tải về máy: không cần mạng
+            data = exam_packs.load(exam_id)
+            if data is not None:
+                return 200, data
+
+            detail_key = f"exam_detail:{exam_id}"
+            data = prefetcher.get(detail_key, timeout=15)
+            if data is not None:
+                prefetcher.discard(detail_key)
+                return 200, data
+
+            res = api.get(
+                f"{API_PATH}/exams/{exam_id}/detail",
+                token=token,
+                timeout=15,
+                hedge=True
+            )
+            return res.status_code, res.json()
+
+        def _done(result):
+            status_code, data = result
+            if status_code == 200 and data.get("success"):
+                screen = self.manager.get_screen("exam_question")
+                screen.set_exam(data)
+                self.manager.current = "exam_question"
+            else:
+                msg = data.get("message", "Không tải được đề thi")
+                self.show_error_dialog("Lỗi", msg)
 
-            finally:
-                Clock.schedule_once(lambda dt: self.hide_loading())
+        def _failed(e):
+            print("❌ Error:", e)
+            self.show_error_dialog("Lỗi", f"Không thể tải đề thi:\n{str(e)}")
 
-        threading.Thread(target=_load_exam, daemon=True).start()
+        self.tasks.submit(_load_exam, key='exam_detail', on_success=_done, on_error=_failed, on_finally=self.hide_loading)
 
     def go_back(self, instance=None):
         self.manager.current = 'home'
 
     def get_token(self):
         try:
-            from kivy.storage.jsonstore import JsonStore
-            store = JsonStore('user.json')
-
-            if store.exists("auth"):
-                auth_data = store.get("auth")
-                token = auth_data.get("token")
+            if session_store.exists("auth"):
+                token = session_store.token
 
                 if token:
                     token = token.strip()
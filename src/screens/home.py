@@ -11,6 +11,8 @@ from kivy.metrics import dp
 from kivymd.uix.toolbar import MDTopAppBar
 import os
 
+from ..services.session_store import session_store
+
 
 class HomeScreen(Screen):
     def __init__(self, **kwargs):
@@ -90,11 +92,8 @@ class HomeScreen(Screen):
 
     def load_user_data(self):
         try:
-            from kivy.storage.jsonstore import JsonStore
-            store = JsonStore('user.json')
-            if store.exists('auth'):
-                auth= store.get('auth')
-                self.user_data = auth.get('user')
+            self.user_data = session_store.user
+            if self.user_data:
                 self.update_user_card()
         except Exception as e:
             print(f"Lỗi load user data: {e}")
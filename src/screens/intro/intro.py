@@ -2,11 +2,14 @@ from kivy.uix.screenmanager import Screen
 from kivy.uix.image import Image
 from kivy.uix.floatlayout import FloatLayout
 from kivy.graphics import Color, Rectangle
-from kivy.storage.jsonstore import JsonStore
 from kivy.clock import Clock
 from datetime import datetime, timedelta
-import requests
-import threading
+
+from ...services.answer_journal import answer_journal
+from ...services.api_client import api
+from ...services.session_store import session_store
+from ...services.task_runner import task_runner, run_on_main
+from ...services.warmup import warmer
 
 class IntroScreen(Screen):
     def __init__(self, **kwargs):
@@ -29,7 +32,10 @@ class IntroScreen(Screen):
         )
         layout.add_widget(logo)
         self.add_widget(layout)
-        Clock.schedule_once(self.check_user_login, 1)
+        # Đánh thức backend ngay trong lúc hiện splash
+        warmer.warm_up()
+        # Không chờ cố định: kiểm tra ngay ở frame đầu tiên
+        Clock.schedule_once(self.check_user_login, 0)
 
     def _update_bg(self, instance, value):
         self.bg_rect.size = instance.size
@@ -37,28 +43,33 @@ class IntroScreen(Screen):
 
     def check_user_login(self, dt):
         try:
-            store = JsonStore("user.json")
-
-            if not store.exists("auth"):
+            if not session_store.exists("auth"):
                 print("Chưa có dữ liệu đăng nhập -> Vào màn hình Intro")
                 return self.goto_intro_info()
 
-            data = store.get("auth")
-            token = data.get("token")
+            token = session_store.token
 
             if not token:
                 return self.goto_intro_info()
-            threading.Thread(target=self.verify_token_with_server, args=(token,)).start()
+
+            # Token còn hạn (đọc exp tại máy): vào home ngay bằng user đã lưu,
+            # xác thực lại với server ở nền
+            if session_store.token_valid() and session_store.user:
+                self.goto_home()
+                task_runner.submit(self.verify_token_with_server, token, True)
+                return
+
+            task_runner.submit(self.verify_token_with_server, token)
 
         except Exception as e:
             print("Lỗi IntroScreen:", e)
             self.goto_intro_info()
 
-    def verify_token_with_server(self, old_token):
+    def verify_token_with_server(self, old_token, background=False):
         try:
-            response = requests.get(
-                'https://backend-onlinesystem.onrender.com/api/users/auth/verify',
-                headers={'Authorization': f'Bearer {old_token}'},
+            response = api.get(
+                '/api/users/auth/verify',
+                token=old_token,
                 timeout=10
             )
 
@@ -67,20 +78,44 @@ class IntroScreen(Screen):
                 if data.get('success'):
                     new_token = data.get('token', old_token)
 
-                    store = JsonStore("user.json")
-                    store.put("auth",
-                              token=new_token,
-                              user=data['user'],
-                              login_time=datetime.now().isoformat()
-                              )
-                    Clock.schedule_once(lambda dt: self.goto_home())
+                    session_store.put("auth",
+                                      token=new_token,
+                                      user=data['user'],
+                                      login_time=datetime.now().isoformat()
+                                      )
+                    if not background:
+                        run_on_main(self.goto_home)
                     return
-            Clock.schedule_once(lambda dt: self.goto_intro_info())
+
+            if not background:
+                run_on_main(self.goto_intro_info)
+            elif response.status_code in (200, 401, 403):
+                run_on_main(self._on_token_rejected)
+            else:
+                # Server lỗi/đang khởi động: giữ phiên đã lưu
+                print(f"Xác thực nền lỗi {response.status_code}, giữ phiên hiện tại")
         except Exception as e:
             print("Lỗi kết nối:", e)
-            Clock.schedule_once(lambda dt: self.goto_intro_info())
+            if not background:
+                run_on_main(self.goto_intro_info)
+
+    def _on_token_rejected(self):
+        """Server từ chối token khi đã vào home: xóa phiên và về màn hình đăng nhập"""
+        session_store.clear_auth()
+        # Đang làm bài thì không đá ra: khi nộp, bài làm vẫn được ghi vào outbox ở trạng
+        # thái chờ đăng nhập và được gửi lại sau khi đăng nhập lại
+        if self.manager.current == "exam_question":
+            return
+        self.manager.current = "login"
 
     def goto_home(self):
+        # App bị tắt khi đang làm bài: quay lại đúng bài thi đó
+        session = answer_journal.load_unfinished()
+        if session:
+            screen = self.manager.get_screen("exam_question")
+            screen.resume_session(session)
+            self.manager.current = "exam_question"
+            return
         self.manager.current = "home"
 
     def goto_intro_info(self, *args):
@@ -1,4 +1,3 @@
-from kivy.storage.jsonstore import JsonStore
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
@@ -10,11 +9,13 @@ from kivy.uix.image import Image
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.graphics import Color, RoundedRectangle
 from kivy.core.window import Window
-from kivy.clock import Clock
 
 import logging
 import requests
-import threading
+
+from ...services.api_client import api
+from ...services.session_store import session_store
+from ...services.task_runner import task_runner, run_on_main
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -76,25 +77,15 @@ class PackageScreen(Screen):
         )
         self.grid.add_widget(loading_label)
 
-        threading.Thread(target=self.load_packages, daemon=True).start()
+        task_runner.submit(self.load_packages)
 
     def load_packages(self):
         try:
             logging.info("Loading packages from API...")
 
-            url = "https://backend-onlinesystem.onrender.com/api/packages"
-
-            response = requests.get(
-                url,
-                timeout=15,
-                headers={
-                    'User-Agent': 'Mozilla/5.0',
-                    'Accept': 'application/json'
-                }
-            )
+            response = api.get("/api/packages", timeout=15)
 
-            logging.info(f"Status: {response.status_code}")
-            logging.info(f"Response content: {response.text[:500]}")
+            logging.info(f"Status: {response.status_code} ({len(response.content)} bytes)")
 
             if response.status_code != 200:
                 raise Exception(f"API trả về lỗi {response.status_code}")
@@ -110,22 +101,22 @@ class PackageScreen(Screen):
             if not packages:
                 raise Exception("Không có gói dịch vụ nào")
 
-            Clock.schedule_once(lambda dt: self.display_packages(packages), 0)
+            run_on_main(self.display_packages, packages)
 
         except requests.exceptions.Timeout:
             error_msg = "Hết thời gian kết nối. Vui lòng thử lại."
             logging.error(error_msg)
-            Clock.schedule_once(lambda dt: self.show_error(error_msg), 0)
+            run_on_main(self.show_error, error_msg)
 
         except requests.exceptions.ConnectionError:
             error_msg = "Không thể kết nối đến server. Kiểm tra mạng."
             logging.error(error_msg)
-            Clock.schedule_once(lambda dt: self.show_error(error_msg), 0)
+            run_on_main(self.show_error, error_msg)
 
         except Exception as e:
             error_msg = f"Lỗi: {str(e)}"
             logging.error(error_msg, exc_info=True)
-            Clock.schedule_once(lambda dt: self.show_error(error_msg), 0)
+            run_on_main(self.show_error, error_msg)
 
     def display_packages(self, packages):
         self.grid.clear_widgets()
@@ -156,8 +147,7 @@ class PackageScreen(Screen):
 
     def set_package(self, pkg):
         try:
-            store = JsonStore("user.json")
-            store.put("package",
+            session_store.put("package",
                       id_package=pkg["id_package"],
                       name_package=pkg["name_package"],
                       price_month=pkg["price_month"],
@@ -7,22 +7,21 @@ from kivymd.uix.toolbar import MDTopAppBar
 from kivy.metrics import dp
 from kivy.utils import get_color_from_hex
 from kivy.graphics import Color, RoundedRectangle
-from kivy.storage.jsonstore import JsonStore
 from kivy.clock import Clock
 import webbrowser
-import requests
-import threading
 import logging
 
 from ...components.loading import LoadingWidget, LoadingDots, LoadingBar
-
-API_BASE_URL = "https://backend-onlinesystem.onrender.com"
+from ...services.api_client import api
+from ...services.session_store import session_store
+from ...services.task_runner import TaskGroup
 
 class PaymentScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.loading_widget = None
         self.order_id = None
+        self.tasks = TaskGroup('payment')
 
         self.toolbar = MDTopAppBar(
             title="Thanh toán",
@@ -35,42 +34,37 @@ class PaymentScreen(Screen):
     def send_payment(self, method, pkg, user, token, key_name, callback=None):
         self.show_loading(f"Đang kết nối {method.upper()}...", style="spinner")
 
-        def payment_thread():
-            try:
-                headers = {"Authorization": f"Bearer {token}"}
-                payload = {
-                    "price_month": int(pkg['price_month']),
-                    "name_package": f"Mua gói {pkg['name_package']}",
-                    "id_package": int(pkg["id_package"])
-                }
-
-                response = requests.post(
-                    f"{API_BASE_URL}/api/payment/{method}",
-                    json=payload, headers=headers, timeout=10
-                )
-                data = response.json()
-                print("Payment response:", data)
-
-                Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-
-                pay_url = data.get(key_name)
-                order_id = data.get("orderId")
-                self.order_id = order_id
-
-                if pay_url:
-                    if callback:
-                        Clock.schedule_once(lambda dt: callback(pay_url, order_id), 0)
-                else:
-                    Clock.schedule_once(
-                        lambda dt: self.show_popup("Lỗi", data.get("message", "Thanh toán không thành công.")),
-                        0
-                    )
-            except Exception as e:
-                print("Payment error:", e)
-                Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-                Clock.schedule_once(lambda dt: self.show_popup("Lỗi", str(e)), 0)
-
-        threading.Thread(target=payment_thread, daemon=True).start()
+        def _send():
+            payload = {
+                "price_month": int(pkg['price_month']),
+                "name_package": f"Mua gói {pkg['name_package']}",
+                "id_package": int(pkg["id_package"])
+            }
+
+            response = api.post(
+                f"/api/payment/{method}",
+                json=payload, token=token, timeout=10
+            )
+            return response.json()
+
+        def _done(data):
+            print("Payment response:", data)
+
+            pay_url = data.get(key_name)
+            order_id = data.get("orderId")
+            self.order_id = order_id
+
+            if pay_url:
+                if callback:
+                    callback(pay_url, order_id)
+            else:
+                self.show_popup("Lỗi", data.get("message", "Thanh toán không thành công."))
+
+        def _failed(e):
+            print("Payment error:", e)
+            self.show_popup("Lỗi", str(e))
+
+        self.tasks.submit(_send, key='payment', on_success=_done, on_error=_failed, on_finally=self.hide_loading)
 
     def pay_with_momo(self, pkg, user, token):
         print("=== Pay with MoMo ===")
@@ -83,15 +77,7 @@ class PaymentScreen(Screen):
         self.send_payment("momo", pkg, user, token, "payUrl", callback=after_payment)
 
     def load_user_and_package(self):
-        store = JsonStore("user.json")
-        user = token = pkg = None
-        if store.exists("auth"):
-            auth_data = store.get("auth")
-            token = auth_data.get("token")
-            user = auth_data.get("user")
-        if store.exists("package"):
-            pkg = store.get("package")
-        return user, pkg, token
+        return session_store.user, session_store.package, session_store.token
 
     def show_loading(self, message="Đang xử lý...", style="spinner"):
         if self.loading_widget: return
@@ -3,17 +3,24 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.metrics import dp
 from kivy.utils import get_color_from_hex
-from kivy.storage.jsonstore import JsonStore
 from kivy.clock import Clock
-import requests
-import threading
 
-API_BASE_URL = "https://backend-onlinesystem.onrender.com"
+from ...services.api_client import api
+from ...services.resilience import backoff_delay
+from ...services.session_store import session_store
+from ...services.task_runner import TaskGroup
+
+STATUS_POLL_DELAY = 5
+STATUS_POLL_MAX_DELAY = 60
+MAX_STATUS_CHECKS = 10
 
 class PaymentSuccessScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.loading_widget = None
+        self.tasks = TaskGroup('payment_success')
+        self.retry_event = None
+        self.status_checks = 0
         self.build_ui()
 
     def build_ui(self):
@@ -44,40 +51,56 @@ class PaymentSuccessScreen(Screen):
         if not token or not pkg:
             return
 
-        store = JsonStore("user.json")
-        if store.exists("last_order"):
-            order_id = store.get("last_order")["order_id"]
+        if session_store.exists("last_order"):
+            order_id = session_store.get("last_order")["order_id"]
         else:
             order_id = None
 
         if not order_id:
             return
 
+        self.status_checks = 0
         self.check_payment_status(order_id, token)
 
+    def on_leave(self):
+        if self.retry_event:
+            self.retry_event.cancel()
+            self.retry_event = None
+        self.tasks.cancel_all()
+        self.hide_loading()
+
     def check_payment_status(self, order_id, token):
         self.show_loading("Đang xác nhận giao dịch...")
-
-        def check_thread():
-            try:
-                res = requests.get(
-                    f"{API_BASE_URL}/api/payment/check-status/{order_id}",
-                    headers={"Authorization": f"Bearer {token}"}
-                ).json()
-                transaction = res.get("transaction")
-                Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-
-                if transaction and transaction.get("status") == "success":
-                    print("Payment SUCCESS")
-                else:
-                    print("Payment chưa thành công, thử lại sau 5 giây...")
-                    Clock.schedule_once(lambda dt: self.check_payment_status(order_id, token), 5)
-
-            except Exception as e:
-                print("Check payment error:", e)
-                Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-
-        threading.Thread(target=check_thread, daemon=True).start()
+        self.status_checks += 1
+
+        def _check():
+            return api.get(
+                f"/api/payment/check-status/{order_id}",
+                token=token,
+                timeout=10
+            ).json()
+
+        def _schedule_retry():
+            if self.status_checks >= MAX_STATUS_CHECKS:
+                print("Chưa xác nhận được giao dịch, dừng kiểm tra")
+                return
+            # Giãn dần khoảng chờ thay vì hỏi server mỗi 5 giây mãi mãi
+            delay = STATUS_POLL_DELAY + backoff_delay(self.status_checks, base=STATUS_POLL_DELAY, cap=STATUS_POLL_MAX_DELAY)
+            print(f"Payment chưa thành công, thử lại sau {delay:.0f} giây...")
+            self.retry_event = Clock.schedule_once(lambda dt: self.check_payment_status(order_id, token), delay)
+
+        def _done(res):
+            transaction = res.get("transaction")
+            if transaction and transaction.get("status") == "success":
+                print("Payment SUCCESS")
+            else:
+                _schedule_retry()
+
+        def _failed(e):
+            print("Check payment error:", e)
+            _schedule_retry()
+
+        self.tasks.submit(_check, key='status', on_success=_done, on_error=_failed, on_finally=self.hide_loading)
 
     def show_loading(self, message="Đang xử lý...", style="spinner"):
         if self.loading_widget: return
@@ -92,12 +115,4 @@ class PaymentSuccessScreen(Screen):
             self.loading_widget = None
 
     def load_user_and_package(self):
-        store = JsonStore("user.json")
-        user = token = pkg = None
-        if store.exists("auth"):
-            auth_data = store.get("auth")
-            token = auth_data.get("token")
-            user = auth_data.get("user")
-        if store.exists("package"):
-            pkg = store.get("package")
-        return user, pkg, token
\ No newline at end of file
+        return session_store.user, session_store.package, session_store.token
\ No newline at end of file
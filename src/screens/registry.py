@@ -0,0 +1,105 @@
+import importlib
+import logging
+import time
+
+from kivy.clock import Clock
+from kivy.uix.screenmanager import ScreenManager
+
+# tên màn hình -> (module, class); module chỉ được import khi cần đến
+SCREENS = {
+    'intro': ('src.screens.intro.intro', 'IntroScreen'),
+    'intro_info': ('src.screens.intro.intro_info', 'IntroInfoScreen'),
+    'login': ('src.screens.account.login', 'LoginScreen'),
+    'register': ('src.screens.account.register', 'RegisterScreen'),
+    'home': ('src.screens.home', 'HomeScreen'),
+    'exam_setup': ('src.screens.exam.exam_setup', 'ExamSetupScreen'),
+    'exam_question': ('src.screens.exam.exam_question', 'ExamQuestionScreen'),
+    'exam_result': ('src.screens.exam.exam_result', 'ExamResultScreen'),
+    'exam_history': ('src.screens.exam.exam_history', 'ExamHistoryScreen'),
+    'exam_detail': ('src.screens.exam.exam_detail', 'ExamDetailScreen'),
+    'personal_info': ('src.screens.account.profile', 'PersonalInfoScreen'),
+    'package': ('src.screens.package.package', 'PackageScreen'),
+    'payment': ('src.screens.package.payment', 'PaymentScreen'),
+    'payment_success': ('src.screens.package.payment_success', 'PaymentSuccessScreen'),
+    'error_404': ('src.screens.error_404', 'Error404Screen'),
+}
+
+# Các màn hình nhiều khả năng được mở tiếp theo, dựng sẵn khi app rảnh
+PREWARM = {
+    'intro': ['home', 'intro_info'],
+    'intro_info': ['login', 'register'],
+    'login': ['home'],
+    'home': ['exam_setup', 'exam_history'],
+    'exam_setup': ['exam_question'],
+    'exam_question': ['exam_result'],
+    'exam_result': ['exam_detail'],
+    'exam_history': ['exam_detail'],
+    'package': ['payment'],
+    'payment': ['payment_success'],
+}
+
+PREWARM_DELAY = 1.0
+
+
+class LazyScreenManager(ScreenManager):
+    """ScreenManager chỉ import và dựng màn hình ở lần đầu điều hướng tới"""
+
+    def __init__(self, registry=None, prewarm=None, **kwargs):
+        super().__init__(**kwargs)
+        self.registry = dict(registry or SCREENS)
+        self.prewarm_map = dict(prewarm or PREWARM)
+        self._prewarm_queue = []
+        self._prewarm_event = None
+
+    def has_screen(self, name):
+        return name in self.registry or super().has_screen(name)
+
+    def get_screen(self, name):
+        if not super().has_screen(name) and name in self.registry:
+            self.build_screen(name)
+        return super().get_screen(name)
+
+    def build_screen(self, name):
+        module_name, class_name = self.registry[name]
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+            screen = getattr(module, class_name)(name=name)
+        except Exception as e:
+            logging.error(f"Lỗi chạy màn hình {name}: {str(e)}", exc_info=True)
+            raise
+        self.add_widget(screen)
+        logging.debug(f"Added screen: {name} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return screen
+
+    def on_current(self, instance, value):
+        super().on_current(instance, value)
+        if value:
+            self.schedule_prewarm(self.prewarm_map.get(value, []))
+
+    def schedule_prewarm(self, names):
+        for name in names:
+            if name not in self._prewarm_queue:
+                self._prewarm_queue.append(name)
+        if self._prewarm_queue and self._prewarm_event is None:
+            self._prewarm_event = Clock.schedule_once(self._prewarm_next, PREWARM_DELAY)
+
+    def _prewarm_next(self, dt):
+        self._prewarm_event = None
+        # Không dựng màn hình khi đang chuyển cảnh để khỏi giật animation
+        if self.transition.is_active:
+            self._prewarm_event = Clock.schedule_once(self._prewarm_next, PREWARM_DELAY)
+            return
+
+        while self._prewarm_queue:
+            name = self._prewarm_queue.pop(0)
+            if not super().has_screen(name):
+                try:
+                    self.build_screen(name)
+                except Exception:
+                    pass
+                break
+
+        # Mỗi lần chỉ dựng một màn hình, phần còn lại để frame sau
+        if self._prewarm_queue:
+            self._prewarm_event = Clock.schedule_once(self._prewarm_next, 0.2)
@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import threading
+
+JOURNAL_DIR = 'journal'
+JOURNAL_FILE = 'exam_session.log'
+COMPACT_EVERY = 50
+
+
+class AnswerJournal:
+    """Nhật ký append-only cho bài thi đang làm, khôi phục được khi app bị tắt giữa chừng
+
+    Mỗi lần chọn đáp án chỉ ghi thêm một dòng JSON nhỏ và fsync, không ghi lại cả
+    file. Sau `COMPACT_EVERY` dòng, nhật ký được gộp lại thành một bản snapshot.
+    """
+
+    def __init__(self, directory=JOURNAL_DIR, compact_every=COMPACT_EVERY):
+        self.directory = directory
+        self.path = os.path.join(directory, JOURNAL_FILE)
+        self.compact_every = compact_every
+        self._file = None
+        self._header = None
+        self._answers = {}
+        self._appends = 0
+        self._lock = threading.Lock()
+
+    def begin(self, exam_data, start_time, end_time):
+        """Bắt đầu phiên mới, ghi đè phiên cũ nếu có"""
+        with self._lock:
+            self._close()
+            self._header = {
+                't': 'start',
+                'exam': exam_data,
+                'start_time': start_time.isoformat(),
+                'end_time': end_time.isoformat(),
+            }
+            self._answers = {}
+            self._rewrite()
+
+    def resume(self, session):
+        """Tiếp tục ghi vào nhật ký của phiên đã khôi phục"""
+        with self._lock:
+            self._close()
+            self._header = session['header']
+            self._answers = dict(session['answers'])
+            self._rewrite()
+
+    def record_answer(self, question_id, answer):
+        with self._lock:
+            if self._header is None:
+                return
+            self._answers[question_id] = answer
+            self._append({'t': 'answer', 'q': question_id, 'a': answer})
+            self._appends += 1
+            if self._appends >= self.compact_every:
+                self._rewrite()
+
+    def finish(self):
+        """Kết thúc phiên (đã nộp bài), xóa nhật ký"""
+        with self._lock:
+            self._close()
+            self._header = None
+            self._answers = {}
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def load_unfinished(self):
+        """Đọc phiên chưa nộp từ lần chạy trước, trả về None nếu không có"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+
+        header = None
+        answers = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Dòng cuối có thể bị cắt dở khi app bị kill
+                logging.warning("Journal: bỏ qua dòng hỏng")
+                continue
+            kind = record.get('t')
+            if kind == 'start':
+                header = record
+                answers = {}
+            elif kind == 'snapshot':
+                answers = {q: a for q, a in record.get('answers', [])}
+            elif kind == 'answer':
+                answers[record['q']] = record['a']
+
+        if header is None:
+            return None
+        return {
+            'header': header,
+            'exam': header['exam'],
+            'start_time': header['start_time'],
+            'end_time': header['end_time'],
+            'answers': answers,
+        }
+
+    def _append(self, record):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rewrite(self):
+        """Gộp nhật ký: header + snapshot đáp án, ghi file tạm rồi rename"""
+        self._close()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self._header, ensure_ascii=False) + '\n')
+            if self._answers:
+                snapshot = {'t': 'snapshot', 'answers': [[q, a] for q, a in self._answers.items()]}
+                f.write(json.dumps(snapshot, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._appends = 0
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+answer_journal = AnswerJournal()
@@ -0,0 +1,330 @@
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from .metrics import metrics
+from .resilience import CircuitOpenError, EndpointRegistry, HedgeBudget, backoff_delay, endpoint_key, RETRY_MAX_DELAY
+from .response_cache import response_cache
+from .single_flight import SingleFlight
+
+API_BASE_URL = "https://backend-onlinesystem.onrender.com"
+
+DEFAULT_TIMEOUT = 10
+CONNECT_TIMEOUT = 5
+MAX_RETRIES = 2
+# POST chỉ được thử lại khi có Idempotency-Key
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+# Chỉ request đọc mới co timeout theo độ trễ đo được; POST (đăng nhập, thanh toán, nộp bài)
+# có thể gặp server khởi động nguội và không được cắt sớm khi server có thể đã xử lý
+ADAPTIVE_TIMEOUT_METHODS = ('GET', 'HEAD')
+RETRY_STATUSES = (429, 502, 503, 504)
+# Gửi request dự phòng khi request đầu chậm hơn p90 của endpoint
+HEDGE_PERCENTILE = 0.9
+HEDGE_WORKERS = 4
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class _TimedConnectionMixin:
+    """Đo thời gian DNS, TCP connect và TLS handshake khi mở kết nối mới"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            addresses = [info[4][0] for info in socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)]
+        except OSError:
+            # Để urllib3 tự báo lỗi phân giải tên như bình thường
+            return super()._new_conn()
+        resolved = time.perf_counter()
+
+        error = None
+        try:
+            # Thử lần lượt từng địa chỉ đã phân giải, giống create_connection
+            for address in dict.fromkeys(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = host
+
+        self._timing = (resolved - started, time.perf_counter() - resolved)
+        metrics.note_connection(*self._timing)
+        return sock
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        dns, tcp = getattr(self, '_timing', (None, None))
+        if dns is not None:
+            metrics.note_connection(dns, tcp, time.perf_counter() - started - dns - tcp)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter dùng kết nối có đo thời gian cho `metrics`"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class ApiClient:
+    """Client HTTP dùng chung cho toàn ứng dụng (giữ kết nối keep-alive)"""
+
+    def __init__(self, base_url=API_BASE_URL, pool_size=8):
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.default_headers = {
+            'User-Agent': 'Mozilla/5.0',
+            'Accept': 'application/json',
+        }
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.endpoints = EndpointRegistry()
+        self.hedge_budget = HedgeBudget()
+        self.single_flight = SingleFlight()
+        self._hedge_pool = None
+        metrics.register_gauge('single_flight_saved', lambda: self.single_flight.saved)
+        metrics.register_gauge('hedged_requests', lambda: self.hedge_budget.hedged)
+
+    @property
+    def session(self):
+        """Mỗi thread một Session nhưng dùng chung pool kết nối"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.default_headers)
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def url(self, path):
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, token=None, headers=None, timeout=DEFAULT_TIMEOUT, retries=None, **kwargs):
+        """Gửi request qua circuit breaker của endpoint, tự thử lại lỗi tạm thời
+
+        `timeout` là mức trần; với GET/HEAD timeout thực tế co theo độ trễ đo được
+        của endpoint, method khác dùng đúng `timeout`. Truyền tuple (connect, read)
+        để dùng đúng giá trị đó.
+        """
+        request_headers = dict(headers or {})
+        if token:
+            request_headers['Authorization'] = f"Bearer {token}"
+
+        url = self.url(path)
+        key = endpoint_key(method, url)
+        breaker = self.endpoints.breaker(key)
+        latency = self.endpoints.latency(key)
+        if retries is None:
+            idempotent = method in IDEMPOTENT_METHODS or 'Idempotency-Key' in request_headers
+            retries = MAX_RETRIES if idempotent else 0
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                raise CircuitOpenError(f"{key}: server đang lỗi, tạm dừng gửi request")
+
+            logging.debug(f"{method} {url}")
+            metrics.begin_request()
+            started = time.perf_counter()
+            try:
+                res = self.session.request(
+                    method, url, headers=request_headers,
+                    timeout=self._timeout(method, timeout, latency, attempt), **kwargs
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                metrics.record(key, time.perf_counter() - started, error=True)
+                breaker.record_failure()
+                if attempt > retries:
+                    raise
+                logging.warning(f"{key} lỗi mạng (lần {attempt}), thử lại: {e}")
+                time.sleep(backoff_delay(attempt))
+                continue
+            except requests.exceptions.RequestException:
+                # Lỗi khác (ChunkedEncodingError, TooManyRedirects...) không thử lại nhưng vẫn
+                # phải báo breaker, nếu không request thăm dò half-open bị kẹt mãi
+                metrics.record(key, time.perf_counter() - started, error=True)
+                breaker.record_failure()
+                raise
+
+            elapsed = time.perf_counter() - started
+            latency.observe(elapsed)
+            metrics.record(
+                key, elapsed,
+                ttfb=res.elapsed.total_seconds(),
+                size=None if kwargs.get('stream') else len(res.content),
+                status=res.status_code
+            )
+            if res.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if res.status_code in RETRY_STATUSES and attempt <= retries:
+                logging.warning(f"{key} trả {res.status_code} (lần {attempt}), thử lại")
+                delay = self._retry_after(res) or backoff_delay(attempt)
+                res.close()
+                time.sleep(delay)
+                continue
+            return res
+
+    def _timeout(self, method, timeout, latency, attempt):
+        if isinstance(timeout, tuple):
+            return timeout
+        cap = timeout or DEFAULT_TIMEOUT
+        if method not in ADAPTIVE_TIMEOUT_METHODS:
+            return min(CONNECT_TIMEOUT, cap), cap
+        # Lần thử lại sau timeout được chờ lâu gấp đôi, không vượt mức trần
+        read = min(cap, latency.timeout(cap) * 2 ** (attempt - 1))
+        return min(CONNECT_TIMEOUT, cap), read
+
+    @staticmethod
+    def _retry_after(res):
+        try:
+            return min(RETRY_MAX_DELAY, float(res.headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, path, hedge=False, **kwargs):
+        """GET; các GET giống hệt (URL, params, header, token) đang chạy dùng chung một request"""
+        if kwargs.get('stream'):
+            return self.request('GET', path, **kwargs)
+        key = self._flight_key('GET', path, kwargs)
+        if hedge:
+            return self.single_flight.do(key, self._hedged, 'GET', path, **kwargs)
+        return self.single_flight.do(key, self.request, 'GET', path, **kwargs)
+
+    def _flight_key(self, method, path, kwargs):
+        params = kwargs.get('params')
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        headers = sorted((kwargs.get('headers') or {}).items())
+        return method, self.url(path), repr(params), repr(headers), kwargs.get('token')
+
+    def _hedged(self, method, path, **kwargs):
+        """Request idempotent có hedge: quá p90 chưa có phản hồi thì gửi thêm một request
+        trên kết nối khác trong pool và lấy kết quả về trước
+
+        Số request hedge bị giới hạn bởi `hedge_budget`.
+        """
+        self.hedge_budget.deposit()
+        delay = self.endpoints.latency(endpoint_key(method, self.url(path))).percentile(HEDGE_PERCENTILE)
+        if delay is None:
+            return self.request(method, path, **kwargs)
+
+        pool = self._hedge_executor()
+        primary = pool.submit(self.request, method, path, **kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.hedge_budget.withdraw():
+            return primary.result()
+
+        logging.debug(f"Hedge {method} {path} sau {delay * 1000:.0f} ms")
+        pending = {primary, pool.submit(self.request, method, path, **kwargs)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    res = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                # Request thua vẫn chạy nốt, đóng response để trả kết nối về pool
+                for other in pending:
+                    other.add_done_callback(_close_response)
+                return res
+        raise error
+
+    def _hedge_executor(self):
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+            return self._hedge_pool
+
+    def get_cached(self, path, params=None, ttl=3600, headers=None, **kwargs):
+        """GET có cache trên đĩa, gửi If-None-Match/If-Modified-Since để revalidate"""
+        cache_key = response_cache.make_key(path, params)
+        entry = response_cache.get(cache_key)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+
+        res = self.get(path, params=params, headers=request_headers, **kwargs)
+        if res.status_code == 304 and entry is not None:
+            response_cache.touch(cache_key, ttl)
+            return entry.data
+
+        res.raise_for_status()
+        data = res.json()
+        response_cache.put(
+            cache_key, data,
+            etag=res.headers.get('ETag'),
+            last_modified=res.headers.get('Last-Modified'),
+            ttl=ttl
+        )
+        return data
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+            if self._hedge_pool is not None:
+                self._hedge_pool.shutdown(wait=False)
+                self._hedge_pool = None
+        self._adapter.close()
+
+
+api = ApiClient()
@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from .api_client import api
+
+PACKS_DIR = 'packs'
+MAX_PACKS_BYTES = 20 * 1024 * 1024
+PACK_FILE = 'exam.json.gz'
+ASSET_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.mp3', '.wav')
+
+
+def _asset_urls(value):
+    """Tìm URL ảnh/âm thanh trong payload đề thi"""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _asset_urls(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _asset_urls(item)
+    elif isinstance(value, str) and value.startswith(('http://', 'https://')):
+        if urlsplit(value).path.lower().endswith(ASSET_EXTENSIONS):
+            yield value
+
+
+def _replace_urls(value, mapping):
+    if isinstance(value, dict):
+        return {k: _replace_urls(v, mapping) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_replace_urls(v, mapping) for v in value]
+    if isinstance(value, str):
+        return mapping.get(value, value)
+    return value
+
+
+class ExamPackStore:
+    """Gói đề thi tải sẵn để làm bài khi mất mạng
+
+    Mỗi gói là một thư mục `packs/<id_ex>/` gồm payload `/exams/{id}/detail` nén gzip
+    và các file ảnh/âm thanh được tham chiếu (URL trong payload được đổi sang đường
+    dẫn cục bộ). Tổng dung lượng bị giới hạn, vượt thì xóa gói lâu chưa dùng nhất.
+    """
+
+    def __init__(self, directory=PACKS_DIR, max_bytes=MAX_PACKS_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = None  # id_ex -> size, thứ tự LRU (cũ nhất ở đầu)
+        self._lock = threading.Lock()
+
+    def has(self, exam_id):
+        with self._lock:
+            self._ensure_index()
+            return str(exam_id) in self._index
+
+    def list(self):
+        with self._lock:
+            self._ensure_index()
+            return list(self._index)
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            self._ensure_index()
+            return sum(self._index.values())
+
+    def load(self, exam_id):
+        """Đọc payload đề thi đã tải về, None nếu chưa có hoặc gói hỏng"""
+        name = str(exam_id)
+        with self._lock:
+            self._ensure_index()
+            if name not in self._index:
+                return None
+            path = os.path.join(self._pack_dir(name), PACK_FILE)
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    pack = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Gói đề {name} hỏng, xóa: {e}")
+                self._remove(name)
+                return None
+            self._index.move_to_end(name)
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return pack['data']
+
+    def download(self, exam_id, token):
+        """Tải đề thi và tài nguyên đi kèm (chạy trong worker), trả về payload đã lưu"""
+        res = api.get(f"/api/exam/exams/{exam_id}/detail", token=token, timeout=15)
+        data = res.json()
+        if res.status_code != 200 or not data.get('success'):
+            raise Exception(data.get('message', f"Không tải được đề thi ({res.status_code})"))
+
+        name = str(exam_id)
+        tmp_dir = self._pack_dir(name) + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(os.path.join(tmp_dir, 'assets'))
+
+        mapping = {}
+        for url in dict.fromkeys(_asset_urls(data)):
+            ext = os.path.splitext(urlsplit(url).path)[1].lower()
+            asset_name = hashlib.sha1(url.encode('utf-8')).hexdigest() + ext
+            try:
+                asset = api.get(url, timeout=15)
+                asset.raise_for_status()
+            except Exception as e:
+                # Thiếu ảnh vẫn làm bài được, chỉ ghi log
+                logging.warning(f"Không tải được tài nguyên {url}: {e}")
+                continue
+            with open(os.path.join(tmp_dir, 'assets', asset_name), 'wb') as f:
+                f.write(asset.content)
+            mapping[url] = os.path.join(self._pack_dir(name), 'assets', asset_name)
+
+        pack = {'id_ex': exam_id, 'downloaded_at': time.time(), 'data': _replace_urls(data, mapping)}
+        with gzip.open(os.path.join(tmp_dir, PACK_FILE), 'wt', encoding='utf-8') as f:
+            json.dump(pack, f, ensure_ascii=False, separators=(',', ':'))
+
+        with self._lock:
+            self._ensure_index()
+            self._remove(name)
+            os.replace(tmp_dir, self._pack_dir(name))
+            self._index[name] = self._dir_size(self._pack_dir(name))
+            self._evict(keep=name)
+        logging.info(f"Đã tải gói đề {name} ({self._index.get(name, 0)} bytes, {len(mapping)} tài nguyên)")
+        return pack['data']
+
+    def remove(self, exam_id):
+        with self._lock:
+            self._ensure_index()
+            self._remove(str(exam_id))
+
+    def _pack_dir(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def _dir_size(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                total += os.path.getsize(os.path.join(root, file_name))
+        return total
+
+    def _ensure_index(self):
+        if self._index is not None:
+            return
+        self._index = OrderedDict()
+        if not os.path.isdir(self.directory):
+            return
+        packs = []
+        for item in os.scandir(self.directory):
+            pack_file = os.path.join(item.path, PACK_FILE)
+            if item.is_dir() and not item.name.endswith('.tmp') and os.path.exists(pack_file):
+                packs.append((os.path.getmtime(pack_file), item.name, self._dir_size(item.path)))
+        for _, name, size in sorted(packs):
+            self._index[name] = size
+
+    def _evict(self, keep):
+        total = sum(self._index.values())
+        for name in list(self._index):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self._index[name]
+            logging.info(f"Vượt dung lượng gói đề, xóa gói {name}")
+            self._remove(name)
+
+    def _remove(self, name):
+        self._index.pop(name, None)
+        shutil.rmtree(self._pack_dir(name), ignore_errors=True)
+
+
+exam_packs = ExamPackStore()
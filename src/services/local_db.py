@@ -0,0 +1,270 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DB_PATH = os.path.join('data', 'app.db')
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    user_id INTEGER NOT NULL,
+    id_result INTEGER NOT NULL,
+    completed_time TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, id_result)
+);
+CREATE INDEX IF NOT EXISTS idx_history_user_time ON history (user_id, completed_time DESC);
+
+CREATE TABLE IF NOT EXISTS results (
+    id_result INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS result_answers (
+    id_result INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    id_ques INTEGER,
+    is_correct INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (id_result, position)
+);
+
+CREATE TABLE IF NOT EXISTS departments (
+    id_department INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS classes (
+    id_class INTEGER PRIMARY KEY,
+    id_department INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_classes_department ON classes (id_department, position);
+
+CREATE TABLE IF NOT EXISTS exams (
+    id_ex INTEGER NOT NULL,
+    id_class INTEGER NOT NULL,
+    difficulty INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (id_class, difficulty, id_ex)
+);
+CREATE INDEX IF NOT EXISTS idx_exams_class ON exams (id_class, difficulty, position);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    id TEXT PRIMARY KEY,
+    exam_id INTEGER,
+    status TEXT NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_due ON submissions (status, next_attempt_at);
+"""
+
+
+class LocalDatabase:
+    """CSDL SQLite cục bộ: lịch sử, chi tiết kết quả, danh mục đề và bài nộp chờ gửi
+
+    Màn hình đọc từ đây trước (truy vấn có index, không cần mạng) rồi đồng bộ với
+    server ở nền. Một kết nối dùng chung, khóa bằng lock; chế độ WAL để đọc không
+    bị chặn bởi ghi.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                conn.executescript(SCHEMA)
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql, args=()):
+        with self._lock:
+            return self._connect().execute(sql, args).fetchall()
+
+    def _transaction(self, statements):
+        """Chạy các câu lệnh (sql, args | [args...]) trong một transaction"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for sql, args in statements:
+                    if isinstance(args, list):
+                        conn.executemany(sql, args)
+                    else:
+                        conn.execute(sql, args)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Đồng bộ ---
+
+    def synced_at(self, scope):
+        rows = self._query('SELECT synced_at FROM sync_state WHERE scope = ?', (scope,))
+        return rows[0]['synced_at'] if rows else None
+
+    @staticmethod
+    def _mark_synced(scope):
+        return 'INSERT OR REPLACE INTO sync_state (scope, synced_at) VALUES (?, ?)', (scope, time.time())
+
+    # --- Lịch sử bài thi ---
+
+    def history(self, user_id):
+        rows = self._query(
+            'SELECT data FROM history WHERE user_id = ? ORDER BY completed_time DESC, id_result DESC',
+            (user_id,)
+        )
+        return [json.loads(row['data']) for row in rows]
+
+    def history_cursor(self, user_id):
+        """(completed_time, id_result) của bài mới nhất đã lưu, None nếu chưa có"""
+        rows = self._query(
+            'SELECT completed_time, id_result FROM history WHERE user_id = ? '
+            'ORDER BY completed_time DESC, id_result DESC LIMIT 1',
+            (user_id,)
+        )
+        return (rows[0]['completed_time'], rows[0]['id_result']) if rows else None
+
+    def replace_history(self, user_id, items):
+        """Đồng bộ toàn bộ: thay danh sách cũ (xóa cả bài đã bị xóa trên server)"""
+        self._transaction([
+            ('DELETE FROM history WHERE user_id = ?', (user_id,)),
+            self._history_rows(user_id, items),
+            self._mark_synced(f'history:{user_id}'),
+        ])
+
+    def merge_history(self, user_id, items):
+        """Đồng bộ delta: thêm/cập nhật các bài mới, giữ nguyên phần còn lại"""
+        self._transaction([self._history_rows(user_id, items)])
+
+    @staticmethod
+    def _history_rows(user_id, items):
+        return 'INSERT OR REPLACE INTO history (user_id, id_result, completed_time, data) VALUES (?, ?, ?, ?)', [
+            (user_id, item.get('id_result'), str(item.get('completed_time') or item.get('created_at') or ''),
+             json.dumps(item, ensure_ascii=False))
+            for item in items
+        ]
+
+    # --- Chi tiết kết quả ---
+
+    def result_detail(self, id_result):
+        """Trả về (result, answers) hoặc None nếu chưa lưu"""
+        rows = self._query('SELECT data FROM results WHERE id_result = ?', (id_result,))
+        if not rows:
+            return None
+        answers = self._query(
+            'SELECT data FROM result_answers WHERE id_result = ? ORDER BY position', (id_result,)
+        )
+        return json.loads(rows[0]['data']), [json.loads(row['data']) for row in answers]
+
+    def put_result_detail(self, id_result, result, answers):
+        self._transaction([
+            ('INSERT OR REPLACE INTO results (id_result, data, synced_at) VALUES (?, ?, ?)',
+             (id_result, json.dumps(result, ensure_ascii=False), time.time())),
+            ('DELETE FROM result_answers WHERE id_result = ?', (id_result,)),
+            ('INSERT INTO result_answers (id_result, position, id_ques, is_correct, data) VALUES (?, ?, ?, ?, ?)', [
+                (id_result, i, answer.get('id_ques'), int(bool(answer.get('is_correct'))),
+                 json.dumps(answer, ensure_ascii=False))
+                for i, answer in enumerate(answers)
+            ]),
+        ])
+
+    # --- Danh mục môn / lớp / đề ---
+
+    def departments(self):
+        rows = self._query('SELECT data FROM departments ORDER BY position')
+        return self._catalog(rows, 'departments')
+
+    def put_departments(self, items):
+        self._transaction([
+            ('DELETE FROM departments', ()),
+            ('INSERT INTO departments (id_department, position, data) VALUES (?, ?, ?)', [
+                (item['id_department'], i, json.dumps(item, ensure_ascii=False)) for i, item in enumerate(items)
+            ]),
+            self._mark_synced('departments'),
+        ])
+
+    def classes(self, id_department):
+        rows = self._query(
+            'SELECT data FROM classes WHERE id_department = ? ORDER BY position', (id_department,)
+        )
+        return self._catalog(rows, f'classes:{id_department}')
+
+    def put_classes(self, id_department, items):
+        self._transaction([
+            ('DELETE FROM classes WHERE id_department = ?', (id_department,)),
+            ('INSERT OR REPLACE INTO classes (id_class, id_department, position, data) VALUES (?, ?, ?, ?)', [
+                (item['id_class'], id_department, i, json.dumps(item, ensure_ascii=False))
+                for i, item in enumerate(items)
+            ]),
+            self._mark_synced(f'classes:{id_department}'),
+        ])
+
+    def exams(self, id_class, difficulty):
+        rows = self._query(
+            'SELECT data FROM exams WHERE id_class = ? AND difficulty = ? ORDER BY position',
+            (id_class, difficulty)
+        )
+        return self._catalog(rows, f'exams:{id_class}:{difficulty}')
+
+    def put_exams(self, id_class, difficulty, items):
+        self._transaction([
+            ('DELETE FROM exams WHERE id_class = ? AND difficulty = ?', (id_class, difficulty)),
+            ('INSERT OR REPLACE INTO exams (id_ex, id_class, difficulty, position, data) VALUES (?, ?, ?, ?, ?)', [
+                (item['id_ex'], id_class, difficulty, i, json.dumps(item, ensure_ascii=False))
+                for i, item in enumerate(items)
+            ]),
+            self._mark_synced(f'exams:{id_class}:{difficulty}'),
+        ])
+
+    def _catalog(self, rows, scope):
+        """(danh sách, thời điểm đồng bộ); (None, None) nếu chưa từng đồng bộ"""
+        synced_at = self.synced_at(scope)
+        if synced_at is None:
+            return None, None
+        return [json.loads(row['data']) for row in rows], synced_at
+
+    # --- Bài nộp chờ gửi ---
+
+    def submissions(self):
+        rows = self._query('SELECT data FROM submissions ORDER BY created_at')
+        return [json.loads(row['data']) for row in rows]
+
+    def save_submission(self, entry):
+        self._transaction([
+            ('INSERT OR REPLACE INTO submissions (id, exam_id, status, next_attempt_at, created_at, data) '
+             'VALUES (?, ?, ?, ?, ?, ?)',
+             (entry['id'], entry.get('exam_id'), entry['status'], entry.get('next_attempt_at', 0),
+              entry.get('created_at', time.time()), json.dumps(entry, ensure_ascii=False))),
+        ])
+
+    def delete_submission(self, entry_id):
+        self._transaction([('DELETE FROM submissions WHERE id = ?', (entry_id,))])
+
+
+local_db = LocalDatabase()
@@ -0,0 +1,163 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+METRICS_DIR = 'metrics'
+
+# Mốc bucket cố định nên bộ nhớ không tăng theo số request
+LATENCY_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 300, 500, 750, 1000, 1500,
+                     2000, 3000, 5000, 7500, 10000, 20000, 40000, 60000)
+SIZE_BOUNDS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Histogram bucket cố định, ước lượng phân vị bằng nội suy trong bucket"""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 1),
+            'p50': round(self.percentile(0.5), 1),
+            'p95': round(self.percentile(0.95), 1),
+            'p99': round(self.percentile(0.99), 1),
+            'max': round(self.max, 1),
+        }
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.statuses = {}
+        self.dns = Histogram(LATENCY_BOUNDS_MS)
+        self.connect = Histogram(LATENCY_BOUNDS_MS)
+        self.tls = Histogram(LATENCY_BOUNDS_MS)
+        self.ttfb = Histogram(LATENCY_BOUNDS_MS)
+        self.total = Histogram(LATENCY_BOUNDS_MS)
+        self.size = Histogram(SIZE_BOUNDS)
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.requests, 3) if self.requests else 0,
+            'statuses': dict(self.statuses),
+            'dns_ms': self.dns.summary(),
+            'connect_ms': self.connect.summary(),
+            'tls_ms': self.tls.summary(),
+            'ttfb_ms': self.ttfb.summary(),
+            'total_ms': self.total.summary(),
+            'size_bytes': self.size.summary(),
+        }
+
+
+class MetricsRegistry:
+    """Số liệu mạng theo endpoint: số request, lỗi, thời gian DNS/connect/TTFB/tổng, kích thước
+
+    Thời gian DNS/connect/TLS chỉ có khi request phải mở kết nối mới; lớp kết nối
+    ghi chúng vào thread hiện tại qua `note_connection`. Ngoài ra có thể đăng ký
+    gauge (hàm trả về số) để overlay hiển thị các bộ đếm khác.
+    """
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self.started_at = time.time()
+        self._endpoints = {}
+        self._gauges = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def begin_request(self):
+        self._local.connection = None
+
+    def note_connection(self, dns=None, connect=None, tls=None):
+        self._local.connection = (dns, connect, tls)
+
+    def record(self, key, total, ttfb=None, size=None, status=None, error=False):
+        """Ghi một request; thời gian tính bằng giây"""
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointMetrics()
+            stats.requests += 1
+            if error or (status is not None and status >= 500):
+                stats.errors += 1
+            label = str(status) if status is not None else 'error'
+            stats.statuses[label] = stats.statuses.get(label, 0) + 1
+            stats.total.record(total * 1000)
+            if ttfb is not None:
+                stats.ttfb.record(ttfb * 1000)
+            if size is not None:
+                stats.size.record(size)
+            if connection:
+                for histogram, value in zip((stats.dns, stats.connect, stats.tls), connection):
+                    if value is not None:
+                        histogram.record(value * 1000)
+
+    def register_gauge(self, name, fn):
+        self._gauges[name] = fn
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {key: stats.summary() for key, stats in self._endpoints.items()}
+        gauges = {}
+        for name, fn in self._gauges.items():
+            try:
+                gauges[name] = fn()
+            except Exception as e:
+                gauges[name] = f"lỗi: {e}"
+        return {
+            'started_at': self.started_at,
+            'taken_at': time.time(),
+            'endpoints': endpoints,
+            'gauges': gauges,
+        }
+
+    def export(self, path=None):
+        """Ghi snapshot ra file JSON để so sánh giữa các bản build, trả về đường dẫn"""
+        if path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, time.strftime('metrics-%Y%m%d-%H%M%S.json'))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self.started_at = time.time()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+import requests
+
+from .api_client import api
+from .local_db import local_db
+from .session_store import session_store
+from .task_runner import run_on_main
+
+# Thư mục cũ (mỗi bài nộp một file JSON), chỉ còn dùng để chuyển dữ liệu sang SQLite
+OUTBOX_DIR = 'outbox'
+MAX_BACKOFF = 60
+# Bài nộp bị server từ chối hẳn chỉ giữ lại chừng này rồi xóa khỏi `submissions`
+FAILED_RETENTION = 7 * 24 * 3600
+
+STATUS_PENDING = 'pending'
+STATUS_SENT = 'sent'
+STATUS_RETRYING = 'retrying'
+STATUS_AUTH = 'auth'
+STATUS_FAILED = 'failed'
+
+
+def _get_token():
+    return session_store.token
+
+
+class SubmissionOutbox:
+    """Hàng đợi nộp bài bền vững: ghi xuống đĩa trước, gửi ngầm và thử lại khi lỗi
+
+    Mỗi bài nộp có một idempotency key gửi kèm header `Idempotency-Key` để server
+    bỏ qua bản gửi trùng khi một lần thử trước thực ra đã tới nơi. Bài nộp được lưu
+    trong bảng `submissions` của `local_db`.
+    """
+
+    def __init__(self, directory=OUTBOX_DIR, token_provider=_get_token, db=local_db):
+        self.directory = directory
+        self.db = db
+        self.token_provider = token_provider
+        self._entries = {}
+        self._listeners = {}
+        self._loaded = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def enqueue(self, exam_id, payload):
+        entry = {
+            'id': uuid.uuid4().hex,
+            'exam_id': exam_id,
+            'payload': payload,
+            'created_at': time.time(),
+            'attempts': 0,
+            'next_attempt_at': 0,
+            'status': STATUS_PENDING,
+            'error': None,
+        }
+        with self._cond:
+            self._load()
+            self._save(entry)
+            self._entries[entry['id']] = entry
+        return entry
+
+    def send(self, entry_id, listener=None):
+        if listener:
+            with self._cond:
+                self._listeners[entry_id] = listener
+        self.start()
+
+    def start(self):
+        """Nạp bài nộp còn tồn từ lần chạy trước và đánh thức worker
+
+        Gọi lại sau khi đăng nhập để gửi tiếp các bài đang chờ vì lỗi xác thực.
+        """
+        with self._cond:
+            self._load()
+            expired = time.time() - FAILED_RETENTION
+            for entry in list(self._entries.values()):
+                if entry['status'] == STATUS_AUTH:
+                    entry['status'] = STATUS_PENDING
+                    entry['next_attempt_at'] = 0
+                elif entry['status'] == STATUS_FAILED and entry.get('failed_at', entry['created_at']) < expired:
+                    self._remove(entry['id'])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name='outbox', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            self._load()
+            return [dict(e) for e in self._entries.values() if e['status'] in (STATUS_PENDING, STATUS_RETRYING)]
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        self._migrate_files()
+        for entry in self.db.submissions():
+            self._entries[entry['id']] = entry
+
+    def _migrate_files(self):
+        """Chuyển bài nộp còn tồn ở định dạng file cũ vào SQLite"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                self.db.save_submission(entry)
+                os.remove(path)
+            except (OSError, ValueError, KeyError) as e:
+                logging.error(f"Outbox: không đọc được {name}: {e}")
+
+    def _save(self, entry):
+        self.db.save_submission(entry)
+
+    def _remove(self, entry_id):
+        self._entries.pop(entry_id, None)
+        self.db.delete_submission(entry_id)
+
+    def _next_due(self):
+        due = [e for e in self._entries.values() if e['status'] in (STATUS_PENDING, STATUS_RETRYING)]
+        if not due:
+            return None
+        return min(due, key=lambda e: e['next_attempt_at'])
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                entry = self._next_due()
+                while entry is None or entry['next_attempt_at'] > time.time():
+                    timeout = None if entry is None else entry['next_attempt_at'] - time.time()
+                    self._cond.wait(timeout)
+                    entry = self._next_due()
+
+            result, error, status = self._attempt(entry)
+
+            with self._cond:
+                entry['status'] = status
+                entry['error'] = error
+                if status == STATUS_SENT:
+                    self._remove(entry['id'])
+                else:
+                    if status == STATUS_FAILED:
+                        entry['failed_at'] = time.time()
+                    if status == STATUS_RETRYING:
+                        delay = min(MAX_BACKOFF, 2 ** (entry['attempts'] - 1))
+                        entry['next_attempt_at'] = time.time() + delay * random.uniform(0.5, 1.0)
+                    self._save(entry)
+
+            self._notify(entry, result, error)
+
+    def _attempt(self, entry):
+        entry['attempts'] += 1
+        token = self.token_provider()
+        if not token:
+            return None, "Bạn chưa đăng nhập hoặc token không hợp lệ.", STATUS_AUTH
+
+        try:
+            res = api.post(
+                f"/api/exam/exams/{entry['exam_id']}/submit",
+                json=entry['payload'],
+                token=token,
+                headers={'Idempotency-Key': entry['id']},
+                timeout=10,
+                # Outbox tự thử lại với backoff dài hơn và báo trạng thái từng lần
+                retries=0
+            )
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Outbox: gửi {entry['id']} lỗi mạng (lần {entry['attempts']}): {e}")
+            return None, f"Lỗi khi nộp bài: {str(e)}", STATUS_RETRYING
+
+        try:
+            data = res.json()
+        except Exception:
+            data = {"success": False, "message": "Backend không trả dữ liệu hợp lệ"}
+
+        if res.status_code == 200 and data.get('success'):
+            return data.get('result'), None, STATUS_SENT
+        if res.status_code == 401:
+            return None, "Token hết hạn hoặc không hợp lệ. Vui lòng đăng nhập lại.", STATUS_AUTH
+        if res.status_code in (408, 429) or res.status_code >= 500:
+            return None, f"Server bận ({res.status_code})", STATUS_RETRYING
+        return None, data.get('message', f"Nộp bài thất bại ({res.status_code})"), STATUS_FAILED
+
+    def _notify(self, entry, result, error):
+        with self._cond:
+            listener = self._listeners.get(entry['id'])
+            if entry['status'] in (STATUS_SENT, STATUS_FAILED):
+                self._listeners.pop(entry['id'], None)
+        if listener:
+            run_on_main(listener, dict(entry), result, error)
+        elif entry['status'] == STATUS_SENT:
+            logging.info(f"Outbox: đã gửi bài nộp tồn đọng {entry['id']}")
+
+
+outbox = SubmissionOutbox()
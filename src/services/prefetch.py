@@ -0,0 +1,115 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class Prefetcher:
+    """Tải trước dữ liệu người dùng nhiều khả năng sẽ cần, chạy ngầm ưu tiên thấp
+
+    Có hàng đợi ưu tiên và thread riêng nên không chiếm worker của task_runner.
+    Kết quả được giữ trong bộ nhớ một thời gian ngắn để màn hình lấy lại.
+    """
+
+    def __init__(self, workers=3, max_items=32, ttl=300):
+        self.workers = workers
+        self.max_items = max_items
+        self.ttl = ttl
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._jobs = {}
+        self._results = OrderedDict()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def prefetch(self, key, fn, *args, priority=PRIORITY_LOW):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.done():
+                return job
+            if self._fresh_result(key) is not None:
+                return None
+
+            future = Future()
+            self._jobs[key] = future
+            self._start_workers()
+
+        self._queue.put((priority, next(self._seq), key, fn, args, future))
+        return future
+
+    def get(self, key, timeout=None):
+        """Lấy kết quả đã tải trước; nếu đang tải thì chờ tối đa `timeout` giây"""
+        with self._lock:
+            data = self._fresh_result(key)
+            if data is not None:
+                return data
+            future = self._jobs.get(key)
+
+        if future is None or future.cancelled():
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return None
+
+    def discard(self, key):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def cancel_pending(self):
+        """Hủy các tác vụ chưa chạy (tác vụ đang chạy vẫn được hoàn tất)"""
+        with self._lock:
+            jobs = list(self._jobs.items())
+        for key, future in jobs:
+            if future.cancel():
+                with self._lock:
+                    if self._jobs.get(key) is future:
+                        del self._jobs[key]
+
+    def _fresh_result(self, key):
+        item = self._results.get(key)
+        if item is None:
+            return None
+        stored_at, data = item
+        if time.time() - stored_at > self.ttl:
+            del self._results[key]
+            return None
+        return data
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"prefetch-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _worker(self):
+        while True:
+            priority, _, key, fn, args, future = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except Exception as e:
+                logging.debug(f"Prefetch {key} lỗi: {e}")
+                future.set_exception(e)
+                continue
+
+            with self._lock:
+                if result is not None:
+                    self._results[key] = (time.time(), result)
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_items:
+                        self._results.popitem(last=False)
+                if self._jobs.get(key) is future:
+                    del self._jobs[key]
+            future.set_result(result)
+
+
+prefetcher = Prefetcher()
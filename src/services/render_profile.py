@@ -0,0 +1,134 @@
+import logging
+import statistics
+import weakref
+
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.graphics import BoxShadow
+from kivy.lang import Builder, global_idmap
+from kivy.properties import BooleanProperty, NumericProperty, OptionProperty
+
+from .metrics import metrics
+from .session_store import session_store
+
+MODE_AUTO = 'auto'
+MODE_NORMAL = 'normal'
+MODE_LOW_POWER = 'low_power'
+MODES = (MODE_AUTO, MODE_NORMAL, MODE_LOW_POWER)
+SETTINGS_KEY = 'render'
+
+# Chế độ auto đo frame time sau khi khởi động xong, tránh lúc đang dựng màn hình đầu
+AUTO_SAMPLE_DELAY = 3.0
+AUTO_SAMPLE_FRAMES = 120
+# Median frame time chậm hơn ~40 fps thì coi là máy yếu
+LOW_POWER_FRAME_TIME = 1 / 40.0
+NORMAL_ANIMATION_FPS = 60
+LOW_POWER_ANIMATION_FPS = 20
+
+
+class RenderProfile(EventDispatcher):
+    """Cấu hình render toàn app: bình thường hoặc tiết kiệm cho máy yếu
+
+    Ở chế độ tiết kiệm: bỏ bóng đổ của mọi widget có elevation (MDCard, nút nổi...),
+    chuyển màn hình không hiệu ứng và animation chạy ở tốc độ khung hình thấp hơn.
+    Màn hình không cần biết chế độ nào đang bật: bóng đổ được gỡ qua rule KV của
+    `CommonElevationBehavior`, transition và animation đọc/bind `low_power`,
+    `animation_fps`. `mode` là lựa chọn của người dùng (lưu lại), `auto` quyết định
+    theo frame time đo được.
+    """
+    mode = OptionProperty(MODE_AUTO, options=MODES)
+    low_power = BooleanProperty(False)
+    animation_fps = NumericProperty(NORMAL_ANIMATION_FPS)
+    measured_frame_ms = NumericProperty(0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._elevated = weakref.WeakSet()
+        self._hidden_shadows = weakref.WeakKeyDictionary()  # widget -> (vị trí, BoxShadow)
+        self._auto_low_power = False
+        self._samples = []
+        self._sample_event = None
+        self.bind(low_power=self._apply_shadows)
+        metrics.register_gauge('render_low_power', lambda: self.low_power)
+        metrics.register_gauge('frame_time_ms', lambda: self.measured_frame_ms)
+
+    @property
+    def animation_interval(self):
+        return 1.0 / self.animation_fps
+
+    def load(self):
+        """Đọc chế độ đã lưu; với auto thì lên lịch đo frame time"""
+        saved = session_store.get(SETTINGS_KEY).get('mode') if session_store.exists(SETTINGS_KEY) else None
+        self.mode = saved if saved in MODES else MODE_AUTO
+        self._update()
+        if self.mode == MODE_AUTO:
+            Clock.schedule_once(lambda dt: self.measure(), AUTO_SAMPLE_DELAY)
+
+    def set_mode(self, mode):
+        self.mode = mode
+        session_store.put(SETTINGS_KEY, mode=mode)
+        self._update()
+        if mode == MODE_AUTO and not self.measured_frame_ms:
+            self.measure()
+
+    def measure(self):
+        """Lấy mẫu thời gian giữa các frame, xong thì cập nhật chế độ auto"""
+        if self._sample_event:
+            self._sample_event.cancel()
+        self._samples = []
+        self._sample_event = Clock.schedule_interval(self._sample, 0)
+
+    def _sample(self, dt):
+        self._samples.append(dt)
+        if len(self._samples) < AUTO_SAMPLE_FRAMES:
+            return
+        self._sample_event = None
+        frame_time = statistics.median(self._samples)
+        self.measured_frame_ms = round(frame_time * 1000, 1)
+        self._auto_low_power = frame_time > LOW_POWER_FRAME_TIME
+        logging.info(f"Frame time median {self.measured_frame_ms} ms, tiết kiệm: {self._auto_low_power}")
+        self._update()
+        return False
+
+    def _update(self):
+        if self.mode == MODE_AUTO:
+            self.low_power = self._auto_low_power
+        else:
+            self.low_power = self.mode == MODE_LOW_POWER
+        self.animation_fps = LOW_POWER_ANIMATION_FPS if self.low_power else NORMAL_ANIMATION_FPS
+
+    def track(self, widget):
+        """Gọi từ rule KV cho mọi widget có elevation ngay khi được tạo"""
+        widget = widget.__self__  # KV truyền WeakProxy, cần widget thật để giữ weakref
+        self._elevated.add(widget)
+        if self.low_power:
+            self._set_shadow(widget, False)
+
+    def _apply_shadows(self, instance, low_power):
+        for widget in list(self._elevated):
+            self._set_shadow(widget, not low_power)
+
+    def _set_shadow(self, widget, visible):
+        before = widget.canvas.before
+        if visible:
+            hidden = self._hidden_shadows.pop(widget, None)
+            if hidden:
+                before.insert(*hidden)
+            return
+        if widget in self._hidden_shadows:
+            return
+        for index, instruction in enumerate(before.children):
+            if isinstance(instruction, BoxShadow):
+                before.remove(instruction)
+                self._hidden_shadows[widget] = (index, instruction)
+                return
+
+
+render_profile = RenderProfile()
+
+# Cho rule KV (và KV của các màn hình nếu cần) dùng tên `render_profile` như `app`
+global_idmap['render_profile'] = render_profile
+Builder.load_string("""
+<CommonElevationBehavior>:
+    on_kv_post: render_profile.track(self)
+""")
@@ -0,0 +1,166 @@
+import random
+import re
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F-]{16,})$')
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Breaker đang mở: trả lỗi ngay, không gửi request"""
+
+
+def endpoint_key(method, url):
+    """Gom các URL cùng endpoint: /api/exam/exams/12 -> GET host/api/exam/exams/{id}"""
+    parts = urlsplit(url)
+    segments = ['{id}' if _ID_SEGMENT.match(s) else s for s in parts.path.split('/')]
+    return f"{method} {parts.netloc}{'/'.join(segments)}"
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Exponential backoff có jitter (full jitter), `attempt` bắt đầu từ 1"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Ngắt mạch theo endpoint: lỗi liên tiếp quá ngưỡng thì fail-fast một thời gian
+
+    Sau `reset_timeout` giây cho một request thử (half-open); thành công thì đóng
+    lại, lỗi thì mở tiếp.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = STATE_HALF_OPEN
+                self._probing = False
+            if self.state == STATE_HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Ước lượng timeout từ độ trễ đo được (SRTT + 4 * RTTVAR như TCP)"""
+
+    def __init__(self, min_timeout=3.0, min_samples=3, window=64):
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self.samples = 0
+        self.srtt = None
+        self.rttvar = None
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.samples += 1
+            self._recent.append(seconds)
+            if self.srtt is None:
+                self.srtt = seconds
+                self.rttvar = seconds / 2
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - seconds)
+                self.srtt = 0.875 * self.srtt + 0.125 * seconds
+
+    def timeout(self, cap):
+        """Timeout đọc cho request tới, không vượt quá `cap` của nơi gọi"""
+        with self._lock:
+            if self.samples < self.min_samples:
+                return cap
+            return min(cap, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+    def percentile(self, q, min_samples=10):
+        """Phân vị `q` (0-1) của các lần đo gần đây, None khi chưa đủ mẫu"""
+        with self._lock:
+            if len(self._recent) < min_samples:
+                return None
+            ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget:
+    """Giới hạn số request hedge: mỗi request góp `ratio` token, mỗi hedge tiêu 1 token
+
+    Với ratio=0.1, hedge không làm tăng tải quá ~10% kể cả khi server chậm hàng loạt.
+    """
+
+    def __init__(self, ratio=0.1, burst=3):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = float(burst)
+        self.hedged = 0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            self.hedged += 1
+            return True
+
+
+class EndpointRegistry:
+    """Breaker và thống kê độ trễ riêng cho từng endpoint"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, key):
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def latency(self, key):
+        with self._lock:
+            tracker = self._latency.get(key)
+            if tracker is None:
+                tracker = self._latency[key] = LatencyTracker()
+            return tracker
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+CACHE_DIR = os.path.join('cache', 'http')
+MAX_CACHE_BYTES = 2 * 1024 * 1024
+
+
+class CacheEntry:
+    def __init__(self, key, data, etag=None, last_modified=None, stored_at=None, ttl=0):
+        self.key = key
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at or time.time()
+        self.ttl = ttl
+
+    def is_fresh(self):
+        return time.time() - self.stored_at < self.ttl
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'data': self.data,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'stored_at': self.stored_at,
+            'ttl': self.ttl,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['key'], d['data'], d.get('etag'), d.get('last_modified'), d.get('stored_at'), d.get('ttl', 0))
+
+
+class ResponseCache:
+    """Cache response JSON trên đĩa, có TTL, ETag và dọn theo LRU khi vượt dung lượng"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = None  # file -> size, thứ tự LRU (cũ nhất ở đầu)
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path, params=None):
+        if params:
+            return f"GET {path}?{urlencode(sorted(params.items()))}"
+        return f"GET {path}"
+
+    def _file_name(self, key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+
+    def _ensure_index(self):
+        if self._index is not None:
+            return
+        self._index = OrderedDict()
+        if not os.path.isdir(self.directory):
+            return
+        files = []
+        for item in os.scandir(self.directory):
+            if item.name.endswith('.json'):
+                st = item.stat()
+                files.append((st.st_mtime, item.name, st.st_size))
+        for _, name, size in sorted(files):
+            self._index[name] = size
+
+    def get(self, key):
+        with self._lock:
+            self._ensure_index()
+            name = self._file_name(key)
+            if name not in self._index:
+                return None
+
+            entry = self._memory.get(name)
+            path = os.path.join(self.directory, name)
+            if entry is None:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        entry = CacheEntry.from_dict(json.load(f))
+                except (OSError, ValueError, KeyError) as e:
+                    logging.warning(f"Cache hỏng, bỏ qua {name}: {e}")
+                    self._remove(name)
+                    return None
+                self._memory[name] = entry
+
+            self._index.move_to_end(name)
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return entry
+
+    def put(self, key, data, etag=None, last_modified=None, ttl=0):
+        entry = CacheEntry(key, data, etag, last_modified, ttl=ttl)
+        with self._lock:
+            self._ensure_index()
+            self._write(entry)
+            return entry
+
+    def touch(self, key, ttl=None):
+        """Làm mới thời điểm lưu khi server trả 304 Not Modified"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        entry.stored_at = time.time()
+        if ttl is not None:
+            entry.ttl = ttl
+        with self._lock:
+            self._write(entry)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._ensure_index()
+            for name in list(self._index):
+                self._remove(name)
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            self._ensure_index()
+            return sum(self._index.values())
+
+    def _write(self, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        name = self._file_name(entry.key)
+        path = os.path.join(self.directory, name)
+        payload = json.dumps(entry.to_dict(), ensure_ascii=False).encode('utf-8')
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        self._index[name] = len(payload)
+        self._index.move_to_end(name)
+        self._memory[name] = entry
+        self._evict(keep=name)
+
+    def _evict(self, keep):
+        total = sum(self._index.values())
+        for name in list(self._index):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self._index[name]
+            self._remove(name)
+
+    def _remove(self, name):
+        self._index.pop(name, None)
+        self._memory.pop(name, None)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,151 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+
+SESSION_FILE = 'user.json'
+FLUSH_DELAY = 0.5
+# Coi token sắp hết hạn là hết hạn để tránh lệch giờ giữa máy và server
+EXPIRY_LEEWAY = 60
+
+
+def jwt_expiry(token):
+    """Đọc claim `exp` của JWT (không kiểm tra chữ ký), trả về None nếu không đọc được"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        exp = claims.get('exp')
+        return float(exp) if exp is not None else None
+    except (AttributeError, IndexError, ValueError, TypeError):
+        return None
+
+
+class SessionStore:
+    """Trạng thái phiên (auth, user, package...) dùng chung cho cả app
+
+    Đọc `user.json` một lần rồi phục vụ từ bộ nhớ; API giống JsonStore
+    (exists/get/put/delete) và cùng định dạng file. Thay đổi được gom lại và ghi
+    ngầm sau `FLUSH_DELAY` giây bằng file tạm + rename, không chặn UI.
+    """
+
+    def __init__(self, filename=SESSION_FILE, flush_delay=FLUSH_DELAY):
+        self.filename = filename
+        self.flush_delay = flush_delay
+        self._data = None
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        # Số thứ tự bản chụp: flush chạy song song (Timer và on_stop) không được để
+        # bản chụp cũ ghi đè bản mới hơn trên đĩa
+        self._version = 0
+        self._written_version = 0
+
+    def exists(self, key):
+        with self._lock:
+            return key in self._load()
+
+    def get(self, key):
+        with self._lock:
+            return dict(self._load()[key])
+
+    def put(self, key, **values):
+        with self._lock:
+            self._load()[key] = values
+            self._mark_dirty()
+
+    def delete(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._mark_dirty()
+
+    def clear_auth(self):
+        """Đăng xuất: xóa token và thông tin người dùng"""
+        with self._lock:
+            data = self._load()
+            for key in ('auth', 'user'):
+                data.pop(key, None)
+            self._mark_dirty()
+
+    @property
+    def token(self):
+        with self._lock:
+            auth = self._load().get('auth') or {}
+            return auth.get('token')
+
+    def token_valid(self, leeway=EXPIRY_LEEWAY):
+        """Token còn hạn theo claim `exp`, kiểm tra tại máy không cần gọi server"""
+        exp = jwt_expiry(self.token)
+        return exp is not None and exp - leeway > time.time()
+
+    @property
+    def user(self):
+        with self._lock:
+            auth = self._load().get('auth') or {}
+            return auth.get('user')
+
+    @property
+    def package(self):
+        with self._lock:
+            pkg = self._load().get('package')
+            return dict(pkg) if pkg else None
+
+    def flush(self):
+        """Ghi ngay các thay đổi đang chờ (gọi khi app dừng)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            payload = json.dumps(self._data, ensure_ascii=False)
+            self._dirty = False
+            self._version += 1
+            version = self._version
+
+        # Ghi ngoài _lock để các lần đọc/ghi bộ nhớ không phải chờ đĩa
+        with self._write_lock:
+            if version <= self._written_version:
+                return
+            tmp_path = self.filename + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.filename)
+                self._written_version = version
+            except OSError as e:
+                logging.error(f"SessionStore: không ghi được {self.filename}: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.filename, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except FileNotFoundError:
+                self._data = {}
+            except (OSError, ValueError) as e:
+                logging.error(f"SessionStore: không đọc được {self.filename}: {e}")
+                self._data = {}
+        return self._data
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+
+session_store = SessionStore()
@@ -0,0 +1,45 @@
+import logging
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Gộp các lời gọi trùng key đang chạy đồng thời thành một
+
+    Lời gọi đầu tiên thực sự chạy `fn`; các lời gọi cùng key đến trong lúc đó chờ
+    và nhận chung kết quả (hoặc exception). `saved` đếm số lời gọi được tiết kiệm.
+    """
+
+    def __init__(self):
+        self.saved = 0
+        self.calls = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.saved += 1
+
+        if not leader:
+            logging.debug(f"Single-flight: dùng chung request {key[0]} {key[1]}")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
@@ -0,0 +1,120 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+
+MAX_WORKERS = 4
+
+
+def run_on_main(callback, *args, **kwargs):
+    """Chạy callback trên main thread của Kivy (frame kế tiếp)"""
+    Clock.schedule_once(lambda dt: callback(*args, **kwargs))
+
+
+class TaskRunner:
+    """Thread pool giới hạn dùng chung cho toàn ứng dụng"""
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='task')
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+task_runner = TaskRunner()
+
+
+class TaskGroup:
+    """Nhóm tác vụ của một màn hình, callback luôn chạy trên main thread
+
+    Tác vụ gửi kèm `key` sẽ thay thế tác vụ cùng key trước đó: tác vụ cũ bị
+    hủy nếu chưa chạy, còn nếu đã chạy thì kết quả của nó bị bỏ qua.
+    """
+
+    def __init__(self, name, runner=None):
+        self.name = name
+        self.runner = runner or task_runner
+        self._futures = set()
+        self._latest = {}
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, key=None, on_success=None, on_error=None, on_finally=None, **kwargs):
+        previous = None
+        with self._lock:
+            epoch = self._epoch
+            generation = self._generations.get(key, 0) + 1
+            if key is not None:
+                self._generations[key] = generation
+                previous = self._latest.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+
+        future = self.runner.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._futures.add(future)
+            if key is not None:
+                self._latest[key] = future
+
+        def _done(f):
+            with self._lock:
+                self._futures.discard(f)
+                if self._latest.get(key) is f:
+                    del self._latest[key]
+            if f.cancelled() or not self.is_current(key, generation, epoch):
+                logging.debug(f"[{self.name}] Bỏ qua kết quả cũ (key={key})")
+                return
+            run_on_main(self._dispatch, f, key, generation, epoch, on_success, on_error, on_finally)
+
+        future.add_done_callback(_done)
+        return future
+
+    def is_current(self, key, generation, epoch):
+        with self._lock:
+            if epoch != self._epoch:
+                return False
+            return key is None or self._generations.get(key) == generation
+
+    def _dispatch(self, future, key, generation, epoch, on_success, on_error, on_finally):
+        # Kiểm tra lại trên main thread: có thể đã bị thay thế trong lúc chờ frame
+        if not self.is_current(key, generation, epoch):
+            return
+        try:
+            error = future.exception()
+            if error is None:
+                if on_success:
+                    on_success(future.result())
+            else:
+                logging.error(f"[{self.name}] Task error: {error}")
+                if on_error:
+                    on_error(error)
+        finally:
+            if on_finally:
+                on_finally()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._futures)
+
+    def cancel(self, key):
+        """Hủy tác vụ theo key, kết quả đang chạy dở sẽ bị bỏ qua"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            future = self._latest.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def cancel_all(self):
+        """Hủy mọi tác vụ của màn hình (gọi trong on_leave)"""
+        with self._lock:
+            self._epoch += 1
+            futures = list(self._futures)
+            self._latest.clear()
+        for future in futures:
+            future.cancel()
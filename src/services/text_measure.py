@@ -0,0 +1,119 @@
+from collections import OrderedDict
+
+from kivy.core.text import Label as CoreLabel
+from kivy.core.text.markup import MarkupLabel
+from kivy.metrics import sp
+from kivymd.app import MDApp
+
+from .metrics import metrics
+
+MAX_CACHE_BYTES = 16 * 1024 * 1024
+# Ước lượng bộ nhớ cho một kết quả đo (key + tuple kích thước)
+MEASURE_OVERHEAD = 200
+
+
+class TextLayoutCache:
+    """Cache layout chữ dùng chung cho các màn hình nhiều chữ (làm bài, xem lại đáp án)
+
+    Có hai loại mục, cùng key (text, bề rộng, font, cỡ chữ, đậm, markup):
+    - kích thước khi xuống dòng trong bề rộng đó (chỉ tính layout, không tạo texture)
+    - texture chữ trắng đã render, widget tự tô màu khi vẽ (xem `CachedLabel`)
+
+    Cả hai nằm chung một LRU giới hạn theo số byte ước lượng; texture tính
+    w * h * 4. Tỉ lệ trúng cache được báo lên debug overlay qua `metrics`.
+    """
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (giá trị, số byte)
+        self._stats = {'measure': [0, 0], 'texture': [0, 0]}  # [hit, miss]
+        metrics.register_gauge('text_measure_hit_rate', lambda: self.hit_rate('measure'))
+        metrics.register_gauge('text_texture_hit_rate', lambda: self.hit_rate('texture'))
+        metrics.register_gauge('text_cache_kb', lambda: self.bytes // 1024)
+
+    @staticmethod
+    def _font(font_style, text):
+        """(chữ sau khi viết hoa như MDLabel nếu style yêu cầu, tên font, cỡ chữ)"""
+        font_name, font_size, capitalize = MDApp.get_running_app().theme_cls.font_styles[font_style][:3]
+        return text.upper() if capitalize else text, font_name, sp(font_size)
+
+    @staticmethod
+    def _label(text, width, font, markup):
+        font_name, font_size, bold = font
+        label_class = MarkupLabel if markup else CoreLabel
+        return label_class(
+            text=text,
+            text_size=(width, None),
+            font_size=font_size,
+            font_name=font_name,
+            bold=bold
+        )
+
+    def measure(self, text, width, font_style, markup=False, bold=False):
+        """Trả về (w, h) tính bằng pixel của MDLabel với `font_style` của KivyMD"""
+        if not text:
+            return 0, 0
+        width = int(width)
+        text, font_name, font_size = self._font(font_style, text)
+        font = (font_name, font_size, bold)
+        key = ('measure', text, width, font, markup)
+        size = self._get(key, 'measure')
+        if size is None:
+            size = tuple(self._label(text, width, font, markup).render())
+            self._put(key, size, len(text) * 2 + MEASURE_OVERHEAD)
+        return size
+
+    def height(self, text, width, font_style, markup=False, bold=False):
+        return self.measure(text, width, font_style, markup, bold)[1]
+
+    def texture(self, text, width, font_style, markup=False, bold=False):
+        """Texture chữ trắng đã render, None nếu không có chữ"""
+        if not text:
+            return None
+        width = int(width)
+        text, font_name, font_size = self._font(font_style, text)
+        font = (font_name, font_size, bold)
+        key = ('texture', text, width, font, markup)
+        texture = self._get(key, 'texture')
+        if texture is None:
+            label = self._label(text, width, font, markup)
+            label.refresh()
+            texture = label.texture
+            self._put(key, texture, texture.width * texture.height * 4)
+            measure_key = ('measure', text, width, font, markup)
+            if measure_key not in self._entries:
+                self._put(measure_key, tuple(texture.size), len(text) * 2 + MEASURE_OVERHEAD)
+        return texture
+
+    def hit_rate(self, kind):
+        hits, misses = self._stats[kind]
+        return round(hits / (hits + misses), 3) if hits + misses else None
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+        for stats in self._stats.values():
+            stats[:] = [0, 0]
+
+    def _get(self, key, kind):
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats[kind][1] += 1
+            return None
+        self._stats[kind][0] += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key, value, size):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+
+text_measure = TextLayoutCache()
@@ -0,0 +1,85 @@
+import logging
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from kivy.clock import Clock
+
+from .api_client import api
+from .task_runner import task_runner
+
+WARMUP_PATH = '/'
+# Server miễn phí ngủ sau ~15 phút không có request; ping thưa hơn thế là đủ
+KEEPALIVE_INTERVAL = 240
+# Lần đầu server có thể mất 20-40 giây để khởi động lại
+WARMUP_TIMEOUT = (5, 60)
+PING_TIMEOUT = (5, 20)
+
+
+class BackendWarmer:
+    """Đánh thức backend trong lúc splash và giữ nó thức khi đang làm bài
+
+    Phân giải DNS, mở sẵn kết nối TLS trong pool của `api` và gửi một request rẻ để
+    server khởi động xong trước khi người dùng thao tác thật.
+    """
+
+    def __init__(self, client=api, path=WARMUP_PATH, interval=KEEPALIVE_INTERVAL):
+        self.client = client
+        self.path = path
+        self.interval = interval
+        self.ready_at = None
+        self._warming = None
+        self._pinging = False
+        self._keepalive_event = None
+
+    def warm_up(self):
+        # Thread riêng: request có thể chờ tới 60 giây khi server khởi động nguội, không
+        # được giữ worker của `task_runner` mà xác thực token, tải danh mục đang cần
+        if self._warming is None:
+            self._warming = threading.Thread(target=self._warm, name='warmup', daemon=True)
+            self._warming.start()
+        return self._warming
+
+    def start_keepalive(self):
+        if self._keepalive_event is None:
+            self._keepalive_event = Clock.schedule_interval(self._ping, self.interval)
+
+    def stop_keepalive(self):
+        if self._keepalive_event is not None:
+            self._keepalive_event.cancel()
+            self._keepalive_event = None
+
+    def _warm(self):
+        started = time.perf_counter()
+        parts = urlsplit(self.client.base_url)
+        try:
+            socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+            # Mã trạng thái không quan trọng: server trả lời là đã thức. Chỉ thử một lần,
+            # request thật của người dùng sẽ tự thử lại nếu cần
+            res = self.client.get(self.path, timeout=WARMUP_TIMEOUT, retries=0)
+            res.close()
+            self.ready_at = time.time()
+            logging.info(f"Warm-up backend xong sau {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            logging.warning(f"Warm-up backend lỗi: {e}")
+        finally:
+            self._warming = None
+
+    def _ping(self, dt):
+        if self._pinging:
+            return
+        self._pinging = True
+        task_runner.submit(self._ping_once)
+
+    def _ping_once(self):
+        try:
+            self.client.get(self.path, timeout=PING_TIMEOUT, retries=0).close()
+            self.ready_at = time.time()
+        except Exception as e:
+            logging.debug(f"Keep-alive ping lỗi: {e}")
+        finally:
+            self._pinging = False
+
+
+warmer = BackendWarmer()
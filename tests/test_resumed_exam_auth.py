@@ -0,0 +1,93 @@
+"""Token bị từ chối khi đang làm lại bài dang dở: bài nộp không được mất"""
+import os
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+
+import pytest
+from kivymd.app import MDApp
+
+from src.screens.exam import exam_question
+from src.screens.intro.intro import IntroScreen
+from src.services import outbox as outbox_module
+from src.services.answer_journal import answer_journal
+from src.services.local_db import LocalDatabase
+from src.services.session_store import session_store
+
+EXAM = {
+    'exam': {'id_ex': 7, 'name_ex': 'Đề thử', 'duration': 30},
+    'questions': [
+        {'id_ques': 1, 'ques_text': 'Câu 1', 'ans_a': 'A', 'ans_b': 'B', 'ans_c': 'C', 'ans_d': 'D'},
+        {'id_ques': 2, 'ques_text': 'Câu 2', 'ans_a': 'A', 'ans_b': 'B', 'ans_c': 'C', 'ans_d': 'D'},
+    ],
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def json(self):
+        return {'success': True, 'result': {'score': 50}}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(session_store, 'filename', str(tmp_path / 'user.json'))
+    monkeypatch.setattr(session_store, '_data', {})
+    session_store.put('auth', token='old-token', user={'id': 1, 'fullName': 'Test'})
+
+    outbox = outbox_module.SubmissionOutbox(
+        directory=str(tmp_path / 'outbox'), db=LocalDatabase(str(tmp_path / 'app.db'))
+    )
+    monkeypatch.setattr(exam_question, 'outbox', outbox)
+    monkeypatch.setattr(exam_question.warmer, 'start_keepalive', lambda: None)
+    MDApp.get_running_app() or MDApp()
+    yield outbox
+    session_store.flush()
+
+
+def test_submit_after_token_rejected_in_resumed_exam(env, monkeypatch):
+    outbox = env
+    start = datetime.now()
+    answer_journal.begin(EXAM, start, start + timedelta(minutes=30))
+    answer_journal.record_answer(1, 'B')
+    session = answer_journal.load_unfinished()
+
+    screen = exam_question.ExamQuestionScreen(name='exam_question')
+    screen.resume_session(session)
+
+    # Xác thực nền trả 401 trong lúc đang làm bài
+    IntroScreen._on_token_rejected(SimpleNamespace(manager=SimpleNamespace(current='exam_question')))
+    assert session_store.token is None
+
+    screen.submit_exam()
+
+    assert screen.submission_id is not None
+    assert answer_journal.load_unfinished() is None
+    assert wait_for(lambda: [e['status'] for e in outbox.db.submissions()] == [outbox_module.STATUS_AUTH])
+    entry = outbox.db.submissions()[0]
+    assert entry['exam_id'] == 7
+    assert entry['payload']['answers'] == [{'id_ques': 1, 'answer': 'B'}]
+
+    # Đăng nhập lại: bài nộp đang chờ được gửi đi
+    sent = []
+    monkeypatch.setattr(outbox_module.api, 'post', lambda path, **kwargs: sent.append(kwargs) or FakeResponse())
+    session_store.put('auth', token='new-token', user={'id': 1, 'fullName': 'Test'})
+    outbox.start()
+
+    assert wait_for(lambda: not outbox.db.submissions())
+    assert sent[0]['token'] == 'new-token'
+    assert sent[0]['headers']['Idempotency-Key'] == entry['id']